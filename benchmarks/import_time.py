@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Check that importing bus_generator stays cheap.
+
+``import bus_generator`` must not pull in jinja2 or the SystemRDL compiler.
+Its import time is compared against the import time of those dependencies,
+measured the same way with ``python -X importtime``, so the budget scales with
+the speed of the machine::
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --ratio 0.5 --repeat 5
+
+The script exits with status 1 if bus_generator takes more than ``--ratio``
+of the time of its dependencies.
+"""
+
+import argparse
+import subprocess
+import sys
+
+
+def import_times(*args) -> dict:
+    """Run Python with ``-X importtime`` and return ``{module: cumulative us}``
+    for every module the process imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--ratio",
+        help="largest allowed import time of bus_generator, relative to jinja2 "
+        "and systemrdl (default: %(default)s)",
+        type=float,
+        default=0.6,
+    )
+    parser.add_argument(
+        "--repeat",
+        help="runs per measurement, the fastest is kept (default: %(default)s)",
+        type=int,
+        default=3,
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_arguments(argv)
+    own = min(
+        import_times("-c", "import bus_generator")["bus_generator"]
+        for _ in range(args.repeat)
+    )
+    dependencies = min(
+        sum(
+            import_times("-c", "import jinja2, systemrdl")[name]
+            for name in ("jinja2", "systemrdl")
+        )
+        for _ in range(args.repeat)
+    )
+    print(f"import bus_generator: {own} us, jinja2 and systemrdl: {dependencies} us")
+    if own >= args.ratio * dependencies:
+        print(f"REGRESSION bus_generator takes more than {args.ratio:g} of that")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
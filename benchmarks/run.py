@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Benchmark bus-generator on synthetic register maps.
+
+For every size and template, a synthetic map (see :mod:`synthetic`) is
+generated from scratch by ``cli()`` in a fresh process, with ``--profile``
+phase timing enabled and the on-disk caches disabled. The end-to-end time,
+the time of each phase and the peak resident memory are recorded::
+
+    python benchmarks/run.py -o baseline.json
+    python benchmarks/run.py --sizes 100 1000 --compare baseline.json
+
+With ``--compare``, every time and memory figure that grew by more than
+``--threshold`` over the baseline is reported as a regression and the script
+exits with status 1. Times below ``--min-time`` in the baseline are too noisy
+to compare and are skipped.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import synthetic_rdl
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+DEFAULT_TEMPLATES = ("axi4l", "c_header", "tb_axi4l")
+
+
+def run_case(rdl, template, output_dir, extra_args=()) -> dict:
+    """Generate ``rdl`` with ``template`` in this process and return its
+    measurements. Called in a fresh process by :func:`measure`."""
+    from bus_generator import profiling
+    from bus_generator.bus_generator import cli
+
+    profile = profiling.enable()
+    start = time.perf_counter()
+    cli([rdl, "-o", output_dir, "-t", template, "-q", "--force", "--no-cache"]
+        + list(extra_args))
+    wall = time.perf_counter() - start
+    return {
+        "wall": wall,
+        "peak_rss": profiling.peak_rss(),
+        "phases": {name: entry[1] for name, entry in profile.phases.items()},
+        "counts": profile.counts,
+    }
+
+
+def measure(rdl, template, extra_args=(), repeat=1) -> dict:
+    """Return the measurements of the fastest of ``repeat`` runs."""
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as output_dir:
+            command = [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--case",
+                json.dumps([rdl, template, output_dir, list(extra_args)]),
+            ]
+            proc = subprocess.run(command, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{template} on {rdl} failed:\n{proc.stderr}")
+        runs.append(json.loads(proc.stdout))
+    return min(runs, key=lambda run: run["wall"])
+
+
+def run_benchmarks(sizes, templates, fields=4, extra_args=(), repeat=1) -> dict:
+    """Measure every size and template and return the results document."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            rdl = os.path.join(directory, f"bench{size}.rdl")
+            with open(rdl, "w", encoding="utf8") as fd:
+                fd.write(synthetic_rdl(size, fields=fields))
+            for template in templates:
+                name = f"{template}/{size}"
+                result = measure(rdl, template, extra_args, repeat)
+                results[name] = {"registers": size, "template": template, **result}
+                print(
+                    f"{name:<20} {result['wall'] * 1000:>10.1f} ms "
+                    f"{result['peak_rss'] / 2**20:>8.1f} MiB",
+                    file=sys.stderr,
+                )
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fields_per_register": fields,
+            "extra_args": list(extra_args),
+        },
+        "results": results,
+    }
+
+
+def _metrics(result) -> dict:
+    metrics = {"wall": result["wall"], "peak_rss": result["peak_rss"]}
+    metrics.update(
+        (f"phase {name}", wall) for name, wall in result["phases"].items()
+    )
+    return metrics
+
+
+def compare(baseline: dict, current: dict, threshold=0.2, min_time=0.05) -> list:
+    """Return a description of every metric of ``current`` more than
+    ``threshold`` (a fraction) worse than in ``baseline``.
+
+    Only cases present in both are compared. Times below ``min_time`` seconds
+    in the baseline are skipped.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = _metrics(baseline["results"][name])
+        for metric, value in _metrics(result).items():
+            reference = before.get(metric)
+            if reference is None or metric != "peak_rss" and reference < min_time:
+                continue
+            if value > reference * (1 + threshold):
+                regressions.append(
+                    f"{name} {metric}: {reference:.4g} -> {value:.4g} "
+                    f"(+{(value / reference - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        help="register counts to benchmark (default: %(default)s)",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_SIZES),
+        metavar="N",
+    )
+    parser.add_argument(
+        "--templates",
+        help="templates to benchmark (default: %(default)s)",
+        nargs="+",
+        default=list(DEFAULT_TEMPLATES),
+        metavar="TEMPLATE",
+    )
+    parser.add_argument(
+        "--fields",
+        help="fields per register (default: %(default)s)",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "--repeat",
+        help="runs per case, the fastest is kept (default: %(default)s)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--rolled-arrays",
+        help="pass --rolled-arrays to the generator",
+        action="store_true",
+    )
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument(
+        "--results",
+        help="read the results from this JSON file instead of running",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--compare",
+        help="compare the results with this baseline JSON file",
+        metavar="BASELINE",
+    )
+    parser.add_argument(
+        "--threshold",
+        help="relative growth reported as a regression (default: %(default)s)",
+        type=float,
+        default=0.2,
+    )
+    parser.add_argument(
+        "--min-time",
+        help="skip times shorter than this many seconds in the baseline "
+        "(default: %(default)s)",
+        type=float,
+        default=0.05,
+    )
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_arguments(argv)
+    if args.case:
+        rdl, template, output_dir, extra_args = json.loads(args.case)
+        json.dump(run_case(rdl, template, output_dir, extra_args), sys.stdout)
+        return 0
+
+    if args.results:
+        with open(args.results, encoding="utf8") as fd:
+            current = json.load(fd)
+    else:
+        extra_args = ["--rolled-arrays"] if args.rolled_arrays else []
+        current = run_benchmarks(
+            args.sizes, args.templates, args.fields, extra_args, args.repeat
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as fd:
+            json.dump(current, fd, indent=2)
+            fd.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf8") as fd:
+            baseline = json.load(fd)
+        regressions = compare(baseline, current, args.threshold, args.min_time)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Synthetic SystemRDL register maps of any size for the benchmarks.
+
+A map of ``registers`` registers is split into nested ``block<i>`` addrmaps of
+up to ``block_registers`` registers each. Every block holds one register
+array of up to ``array_size`` elements, plain registers for the rest, and
+optionally one external memory. Each register has ``fields`` fields that
+cycle through the common software/hardware access types.
+"""
+
+from math import ceil
+
+# Field access types, assigned to the fields of a register in turn
+FIELD_ACCESS = (
+    "sw = rw; hw = r;",
+    "sw = r; hw = w;",
+    "sw = rw; hw = rw;",
+    "sw = r; hw = na;",
+)
+
+# Entries of the 32-bit external memory of each block
+MEM_ENTRIES = 64
+MEM_SIZE = MEM_ENTRIES * 4
+
+
+def _field_ranges(fields: int, width: int = 32) -> list:
+    """Split ``width`` bits into ``fields`` contiguous ``(high, low)`` ranges."""
+    if not 1 <= fields <= width:
+        raise ValueError(f"fields must be between 1 and {width}, got {fields}")
+    bounds = [width * index // fields for index in range(fields + 1)]
+    return [(bounds[index + 1] - 1, bounds[index]) for index in range(fields)]
+
+
+def _mem_address(registers: int) -> int:
+    """Return the address of a block's memory, aligned to its size, after
+    ``registers`` registers."""
+    return ceil(registers * 4 / MEM_SIZE) * MEM_SIZE
+
+
+def synthetic_rdl(
+    registers: int,
+    fields: int = 4,
+    block_registers: int = 1000,
+    array_size: int = 16,
+    mems: bool = True,
+    name: str = "bench",
+) -> str:
+    """Return the SystemRDL source of a synthetic map of ``registers``
+    registers."""
+    if registers < 1:
+        raise ValueError(f"registers must be positive, got {registers}")
+    lines = [f"addrmap {name} {{", "    reg reg_t {"]
+    for index, (high, low) in enumerate(_field_ranges(fields)):
+        access = FIELD_ACCESS[index % len(FIELD_ACCESS)]
+        lines.append(f"        field {{ {access} }} f{index}[{high}:{low}] = 0;")
+    lines.append("    };")
+
+    # Every block spans the power of two that fits the largest, first block
+    largest = min(registers, block_registers)
+    end = _mem_address(largest) + MEM_SIZE if mems else largest * 4
+    span = 1 << (end - 1).bit_length()
+    for block in range(ceil(registers / block_registers)):
+        count = min(block_registers, registers - block * block_registers)
+        array = min(array_size, count // 2)
+        lines.append("    addrmap {")
+        if array > 1:
+            lines.append(f"        reg_t arr[{array}] @ 0x0;")
+        else:
+            array = 0
+        lines.extend(
+            f"        reg_t r{index} @ {index * 4:#x};" for index in range(array, count)
+        )
+        if mems:
+            lines.append(
+                f"        external mem {{ mementries = {MEM_ENTRIES}; memwidth = 32; }}"
+                f" ram @ {_mem_address(count):#x};"
+            )
+        lines.append(f"    }} block{block} @ {block * span:#x};")
+    lines.append("};")
+    return "\n".join(lines) + "\n"
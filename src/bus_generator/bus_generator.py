@@ -2,45 +2,98 @@
 """Generate Verilog Control/Status RegisterNode (CSR) module from a SystemRDL
 source."""
 
+from __future__ import annotations
+
 import argparse
-import importlib.metadata
+import contextlib
+import filecmp
+import functools
+import hashlib
+import io
+import json
 import logging
 import os
+import pickle
 import re
 import sys
-from math import ceil, log2
-
-from jinja2 import Environment, FileSystemLoader
-from systemrdl import RDLCompiler, RDLListener, RDLWalker
-from systemrdl.node import (
-    AddressableNode,
-    AddrmapNode,
-    FieldNode,
-    MemNode,
-    Node,
-    RegfileNode,
-    RegNode,
-    SignalNode,
-    VectorNode,
-)
-from systemrdl.rdltypes import AccessType
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING
+
+from . import profiling
+
+# jinja2, the SystemRDL compiler (see bus_generator.model) and the process pool
+# are imported where they are used, so --help, --version, argument errors and
+# plain imports of this module do not pay for loading them.
+if TYPE_CHECKING:
+    from jinja2 import Environment
+    from systemrdl.node import AddrmapNode
+
+    from .model import RegisterMap
+
 
 def _resolve_version() -> str:
     """Return the installed package version, if package metadata is available."""
+    import importlib.metadata
+
     try:
         return importlib.metadata.version("bus-generator")
     except importlib.metadata.PackageNotFoundError:
         return "unknown"
 
 
-__version__ = _resolve_version()
+@functools.cache
+def package_version() -> str:
+    """Return the package version, reading the metadata on first use only."""
+    return _resolve_version()
+
+
+def __getattr__(name):
+    if name == "__version__":
+        return package_version()
+    # The public names of bus_generator.model, imported on first use
+    if not name.startswith("__"):
+        from . import model
+
+        if name in model.__all__:
+            return getattr(model, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# AXI4-Lite bus geometry assumed by the generated Verilog.
-DATA_WIDTH = 32
-ADDR_WIDTH_LSB = 2
 
 TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
 
+LOG_FORMAT = "%(levelname)s: %(funcName)s(): L%(lineno)d: %(message)s"
+
+
+def user_cache_dir() -> str:
+    """Return the per-user directory for bus-generator's persistent caches.
+
+    ``BUS_GENERATOR_CACHE_DIR`` overrides the platform default
+    (``$XDG_CACHE_HOME/bus-generator`` or ``~/.cache/bus-generator`` on Linux,
+    ``~/Library/Caches/bus-generator`` on macOS and
+    ``%LOCALAPPDATA%\\bus-generator`` on Windows).
+    """
+    override = os.environ.get("BUS_GENERATOR_CACHE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(
+            os.path.join("~", "AppData", "Local")
+        )
+    elif sys.platform == "darwin":
+        base = os.path.expanduser(os.path.join("~", "Library", "Caches"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(
+            os.path.join("~", ".cache")
+        )
+    return os.path.join(base, "bus-generator")
+
+
+def template_cache_dir() -> str:
+    """Return the Jinja2 bytecode cache directory for this package version."""
+    return os.path.join(user_cache_dir(), package_version(), "templates")
+
 
 def discover_templates() -> dict:
     """Map a friendly alias to each template stem in TEMPLATES_DIR.
@@ -60,256 +113,67 @@ def discover_templates() -> dict:
     return templates
 
 
-class GeneralListener(RDLListener):
-    """General walker listener."""
-
-    def __init__(self):
-        self._address = 0
-        self._path = []
-        self._root_addrmap = None
-        self._addr_width = 1
-        self._data_width = DATA_WIDTH
-
-    def enter_Component(self, node: Node):
-        if isinstance(node, AddrmapNode):
-            self._addr_width = ceil(log2(node.total_size))
-            if self._root_addrmap is None:
-                self._root_addrmap = node
-            else:
-                self._path.append(node.inst_name)
-        else:
-            self._path.append(node.inst_name)
-
-    def exit_Component(self, node: Node):
-        if node is not self._root_addrmap:
-            self._path.pop()
-
-    def enter_AddressableComponent(self, node: AddressableNode):
-        self._address = node.absolute_address
-        if node.current_idx:
-            for c in node.current_idx:
-                self._path[-1] += "_" + str(c)
-
-
-class ModelPrintingListener(GeneralListener):
-    """Listener used to print node hierarchy."""
-
-    def __init__(self):
-        super().__init__()
+class _VersionAction(argparse.Action):
+    """Like ``action="version"``, but reads the package version only when the
+    option is given."""
 
-    # General node
-
-    def enter_Component(self, node: Node):
-        super().enter_Component(node)
-        print("\t" * len(self._path), end="")
-        print(f"{node.inst_name} ", end="")
-
-    # Addressable node
-
-    def enter_AddressableComponent(self, node: AddressableNode):
-        super().enter_AddressableComponent(node)
-        print(f"@{hex(node.absolute_address)}({hex(node.address_offset)}) ", end="")
-
-    def enter_Addrmap(self, node: AddrmapNode):
-        print(f"addrmap, size: {node.size}")
-
-    def enter_Regfile(self, node: RegfileNode):
-        print(f"regfile, size: {node.size}")
-
-    def enter_Reg(self, node: RegNode):
-        print(f"reg")
-
-    def enter_Mem(self, node: MemNode):
-        print(f"mem, sw: {node.get_property('sw').name}, size: {node.size}")
-
-    # Vector node
-
-    def enter_VectorComponent(self, node: VectorNode):
-        print(f"[{node.high}:{node.low}] ", end="")
-
-    def enter_Field(self, node: FieldNode):
-        print(
-            f"field, sw: {node.get_property('sw').name}, "
-            f"hw: {node.get_property('hw').name}"
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, **kwargs):
+        kwargs.setdefault("help", "show program's version number and exit")
+        super().__init__(
+            option_strings, dest=dest, default=argparse.SUPPRESS, nargs=0, **kwargs
         )
 
-    def enter_Signal(self, node: SignalNode):
-        print(f"signal")
-
-
-class UnsupportedSideEffectWarningListener(RDLListener):
-    """Warn when field side-effect semantics cannot be represented in RTL."""
-
-    def enter_Field(self, node: FieldNode):
-        ignored_semantics = []
-
-        onread = node.get_property("onread")
-        if onread is not None:
-            ignored_semantics.append(f"onread={onread.name}")
-
-        onwrite = node.get_property("onwrite")
-        if onwrite is not None:
-            ignored_semantics.append(f"onwrite={onwrite.name}")
-
-        sw = node.get_property("sw")
-        if sw in {AccessType.rw1, AccessType.w1}:
-            ignored_semantics.append(f"sw={sw.name} (write-once)")
-
-        if ignored_semantics:
-            logging.warning(
-                "Ignoring unsupported SystemRDL side-effect semantics on field "
-                "'%s': %s",
-                node.get_path(),
-                ", ".join(ignored_semantics),
-            )
-
-    def enter_Mem(self, node: MemNode):
-        sw = node.get_property("sw")
-        if sw in {AccessType.rw1, AccessType.w1}:
-            logging.warning(
-                "Ignoring unsupported SystemRDL side-effect semantics on memory "
-                "'%s': sw=%s (write-once)",
-                node.get_path(),
-                sw.name,
-            )
-
-
-def warn_unsupported_side_effects(top: AddrmapNode):
-    """Emit compatibility warnings for unsupported field side effects."""
-    RDLWalker(unroll=True).walk(top, UnsupportedSideEffectWarningListener())
-
-
-class UnsupportedDataWidthError(ValueError):
-    """Raised when an RDL component cannot fit the fixed AXI data bus."""
-
-
-class DataWidthValidationListener(RDLListener):
-    """Collect RDL components that cannot be represented on the AXI data bus."""
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(package_version())
+        parser.exit()
 
-    def __init__(self):
-        self.errors = []
 
-    def enter_Field(self, node: FieldNode):
-        width = node.high - node.low + 1
-        if width > DATA_WIDTH:
-            self.errors.append(
-                "Field '%s' is %d bits wide ([%d:%d]); it exceeds the fixed "
-                "%d-bit DATA_WIDTH."
-                % (node.get_path(), width, node.high, node.low, DATA_WIDTH)
-            )
-        elif node.high >= DATA_WIDTH:
-            self.errors.append(
-                "Field '%s' uses bits [%d:%d], which do not fit the fixed "
-                "%d-bit DATA_WIDTH."
-                % (node.get_path(), node.high, node.low, DATA_WIDTH)
-            )
-
-    def enter_Mem(self, node: MemNode):
-        width = node.get_property("memwidth")
-        if width > DATA_WIDTH:
-            self.errors.append(
-                "Memory '%s' has memwidth %d, which exceeds the fixed %d-bit "
-                "DATA_WIDTH."
-                % (node.get_path(), width, DATA_WIDTH)
-            )
+# Templates that can render register arrays without unrolling them.
+ROLLED_ARRAY_TEMPLATES = ("axi4l", "c_header")
 
 
-def validate_supported_data_widths(top: AddrmapNode):
-    """Reject RDL widths that the fixed 32-bit AXI4-Lite RTL cannot represent."""
-    listener = DataWidthValidationListener()
-    RDLWalker(unroll=True).walk(top, listener)
-    if listener.errors:
-        raise UnsupportedDataWidthError("\n".join(listener.errors))
-
-
-class FieldsGatheringListener(GeneralListener):
-    def __init__(self):
-        super().__init__()
-        self.fields = []
-
-    def exit_Field(self, node: FieldNode):
-        field = {
-            "name": "_".join(self._path),
-            "desc": node.get_property("desc"),
-            "hierarchy": ".".join(self._path),
-            "address": self._address,
-            "aligned_address": int(self._address / 4),
-            "reset": node.get_property("reset") or 0,
-            "width": node.high - node.low + 1,
-            "high": node.high,
-            "mask": 2 ** (node.high + 1) - 2**node.low,
-            "low": node.low,
-            "msb": node.msb,
-            "lsb": node.lsb,
-            "wstrb_cases": [
-                {
-                    "be": 1 << byte,
-                    "mask": (2 ** (node.high + 1) - 2**node.low)
-                    & (0xFF << (byte * 8)),
-                }
-                for byte in range(node.low // 8, node.high // 8 + 1)
-            ],
-            "implements_storage": node.implements_storage,
-            "sw": node.get_property("sw").name,
-            "is_sw_writable": node.is_sw_writable,
-            "is_sw_readable": node.is_sw_readable,
-            "is_hw_writable": node.is_hw_writable,
-            "is_hw_readable": node.is_hw_readable,
-        }
-        self.fields.append(field)
-
-
-class MemGatheringListener(GeneralListener):
-    def __init__(self):
-        super().__init__()
-        self.mems = []
-
-    def exit_Mem(self, node: MemNode):
-        mem = {
-            "name": "_".join(self._path),
-            "desc": node.get_property("desc"),
-            "hierarchy": ".".join(self._path),
-            "address": node.absolute_address,
-            "size": node.size,
-            "mementries": node.get_property("mementries"),
-            "addr_width": ceil(log2(node.size)) - ceil(log2(self._data_width / 8)),
-            "addr_msb": ceil(log2(node.size)) - 1,
-            "addr_lsb": ceil(log2(self._data_width / 8)),
-            "width": node.get_property("memwidth"),
-            "sw": node.get_property("sw").name,
-            "is_sw_writable": node.is_sw_writable,
-            "is_sw_readable": node.is_sw_readable,
-        }
-        self.mems.append(mem)
-
-
-class RegistersGatheringListener(GeneralListener):
-    def __init__(self):
-        super().__init__()
-        self.regs = []
-
-    def exit_Reg(self, node: RegNode):
-        reg = {
-            "name": "_".join(self._path),
-            "hierarchy": ".".join(self._path),
-            "address": node.absolute_address,
-            "aligned_address": int(node.absolute_address / 4),
-            "has_sw_writable": node.has_sw_writable,
-            "has_sw_readable": node.has_sw_readable,
-            "has_hw_writable": node.has_hw_writable,
-            "has_hw_readable": node.has_hw_readable,
-        }
-        self.regs.append(reg)
+def parse_design(spec: str) -> tuple:
+    """Parse a ``--design INPUT[,INPUT...]:OUTPUT_DIR`` specification."""
+    inputs, sep, output = spec.rpartition(":")
+    input_files = tuple(name for name in inputs.split(",") if name)
+    if not sep or not input_files or not output:
+        raise argparse.ArgumentTypeError(
+            f"invalid design '{spec}', expected INPUT[,INPUT...]:OUTPUT_DIR"
+        )
+    return input_files, output
 
 
 def parse_arguments(argv=None) -> argparse.Namespace:
     """Parse arguments for program."""
     # Input and output
-    parser = argparse.ArgumentParser()
-    parser.add_argument("input", help="read input from specified file(s)", nargs="+")
+    parser = argparse.ArgumentParser(fromfile_prefix_chars="@")
+    parser.add_argument("input", help="read input from specified file(s)", nargs="*")
     parser.add_argument(
         "-p", "--print", help="print model hierarchy", action="store_true"
     )
+    parser.add_argument(
+        "--print-depth",
+        help="print at most N levels below the top",
+        type=int,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--print-filter",
+        help="print only the subtrees whose dotted path, e.g. top.block_1.ctrl, "
+        "matches the shell-style PATTERN at every level; repeat to print "
+        "several subtrees",
+        dest="print_filters",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+    )
+    parser.add_argument(
+        "--print-format",
+        help="print indented text, or one JSON object per node (default: "
+        "%(default)s)",
+        choices=["text", "jsonl"],
+        default="text",
+    )
     template_aliases = list(discover_templates())
     parser.add_argument(
         "-t",
@@ -321,6 +185,146 @@ def parse_arguments(argv=None) -> argparse.Namespace:
         nargs="+",
     )
     parser.add_argument("-o", "--output", help="write output to specified folder")
+    parser.add_argument(
+        "--top",
+        help="elaborate the root-level addrmap NAME instead of the last one "
+        "defined; repeat to generate several tops from one compilation",
+        dest="top_names",
+        action="append",
+        default=[],
+        metavar="NAME",
+    )
+    parser.add_argument(
+        "--all-tops",
+        help="generate every root-level addrmap of the input files from one "
+        "compilation",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--select",
+        help="generate only the addrmap at the dotted PATH, e.g. top.sub or "
+        "top.dma[1], as a module of its own with addresses relative to it; "
+        "repeat to generate several addrmaps as separate modules",
+        dest="selections",
+        action="append",
+        default=[],
+        metavar="PATH",
+    )
+    parser.add_argument(
+        "--rolled-arrays",
+        help="keep each register array as one entry and generate loops over "
+        "its elements instead of unrolling it (templates: %s)"
+        % ", ".join(ROLLED_ARRAY_TEMPLATES),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--readback-radix",
+        help="build the axi4l register readback as a balanced OR tree with N "
+        "inputs per node instead of one flat OR (default: flat)",
+        type=int,
+        default=0,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--readback-stages",
+        help="add up to N register stages to the readback tree, each adding "
+        "one cycle of read latency (default: %(default)s)",
+        type=int,
+        default=0,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--response-depth",
+        help="let the axi4l slave issue up to N writes and N reads ahead of "
+        "the master accepting their responses (default: %(default)s)",
+        type=int,
+        default=2,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--dual-issue",
+        help="give the axi4l slave separate read and write issue paths, so "
+        "that a read and a write can issue in the same cycle",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--low-latency-reads",
+        help="let axi4l register reads bypass the read response FIFO while "
+        "it is empty, saving one cycle of read latency",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--design",
+        help="generate an independent design from INPUT file(s) into OUTPUT_DIR; "
+        "repeat to generate several designs in one process",
+        dest="designs",
+        action="append",
+        type=parse_design,
+        default=[],
+        metavar="INPUT[,INPUT...]:OUTPUT_DIR",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="generate up to N --design designs in parallel worker processes "
+        "(0: one per CPU; default: %(default)s)",
+        type=int,
+        default=1,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--render-jobs",
+        help="render the templates of each design in up to N parallel worker "
+        "processes (0: one per CPU; default: %(default)s)",
+        type=int,
+        default=1,
+        metavar="N",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        help="regenerate outputs even if their inputs did not change",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        help="keep running and regenerate a design whenever one of its RDL "
+        "sources changes",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--interval",
+        help="seconds between polls of the RDL sources in --watch mode "
+        "(default: %(default)s)",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--model-cache",
+        help="cache extracted register models on disk and reuse them while "
+        "the RDL sources are unchanged",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        help="print the wall time, CPU time and peak memory of each generation "
+        "phase, and design statistics, to stderr at exit",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="write cProfile statistics of the whole run to FILE, for pstats "
+        "or snakeviz",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="do not read or write the on-disk template and model caches",
+        dest="cache",
+        action="store_false",
+    )
     # By default, the logging level is set to WARNING, which means all
     # warning, error and critical error messages will be shown.
     # Using -q -v or -d to set the logging level.
@@ -350,85 +354,790 @@ def parse_arguments(argv=None) -> argparse.Namespace:
         const=logging.DEBUG,
     )
     # Get the version string of this script.
-    parser.add_argument("-V", "--version", action="version", version=__version__)
+    parser.add_argument("-V", "--version", action=_VersionAction)
     args = parser.parse_args(argv)
-    if args.output is None and not args.print:
+    if args.jobs < 0:
+        parser.error("--jobs must not be negative")
+    if args.render_jobs < 0:
+        parser.error("--render-jobs must not be negative")
+    if args.top_names and args.all_tops:
+        parser.error("--top cannot be combined with --all-tops")
+    if args.print_depth is not None and args.print_depth < 0:
+        parser.error("--print-depth must not be negative")
+    if not args.print and (
+        args.print_depth is not None
+        or args.print_filters
+        or args.print_format != "text"
+    ):
+        parser.error("--print-depth, --print-filter and --print-format need --print")
+    if args.interval <= 0:
+        parser.error("--interval must be positive")
+    if args.readback_radix < 0 or args.readback_radix == 1:
+        parser.error("--readback-radix must be at least 2")
+    if args.readback_stages < 0:
+        parser.error("--readback-stages must not be negative")
+    if args.readback_stages and not args.readback_radix:
+        parser.error("--readback-stages needs --readback-radix")
+    if args.response_depth < 1:
+        parser.error("--response-depth must be positive")
+    if args.rolled_arrays:
+        unsupported = [t for t in args.templates if t not in ROLLED_ARRAY_TEMPLATES]
+        if unsupported:
+            parser.error(
+                "--rolled-arrays does not support template(s): "
+                + ", ".join(unsupported)
+            )
+    if args.designs:
+        if args.input or args.output is not None:
+            parser.error("--design cannot be combined with input files or --output")
+    elif not args.input:
+        parser.error("the following arguments are required: input")
+    elif args.output is None and not args.print:
         parser.error("either --output or --print is required")
     return args
 
 
-def print_hierarchy(top: AddrmapNode):
-    """Print compiled hierarchy for node."""
-    walker = RDLWalker(unroll=True)
-    listener = ModelPrintingListener()
-    walker.walk(top, listener)
-
+def create_environment(cache: bool = True) -> Environment:
+    """Create the Jinja2 Environment used to load the bundled templates.
 
-def convert(top: AddrmapNode, template_name: str):
-    """Convert compiled node hierarchy to generator friendly format."""
-    validate_supported_data_widths(top)
-    walker = RDLWalker(unroll=True)
-
-    listener = FieldsGatheringListener()
-    walker.walk(top, listener)
-    fields = listener.fields
-
-    listener = RegistersGatheringListener()
-    walker.walk(top, listener)
-    regs = listener.regs
-
-    listener = MemGatheringListener()
-    walker.walk(top, listener)
-    mems = listener.mems
+    With ``cache`` set, compiled templates are kept in a bytecode cache under
+    :func:`template_cache_dir`, so later processes skip template compilation.
+    Jinja2 checks each cached entry against the template source, and the
+    directory is per package version.
+    """
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    bytecode_cache = None
+    if cache:
+        directory = template_cache_dir()
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as error:
+            logging.debug(f'Template cache "{directory}" is unavailable: {error}')
+        else:
+            bytecode_cache = FileSystemBytecodeCache(directory)
 
-    # Get Jinja2 Environment
-    env = Environment(
+    return Environment(
         loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=bytecode_cache,
         newline_sequence="\n",
         autoescape=False,
         keep_trailing_newline=True,
     )
 
-    # Render and write target files
-    template = env.get_template(template_name)
-    content = template.render(
-        {
-            "top_name": top.inst_name,
-            "addr_width": ceil(log2(top.total_size)),
-            "addr_width_lsb": ADDR_WIDTH_LSB,
-            "data_width": DATA_WIDTH,
-            "fields": fields,
-            "regs": regs,
-            "mems": mems,
-        }
-    )
 
+def output_name(template_name: str, top_name: str) -> str:
+    """Return the file name a template renders to for ``top_name``."""
+    stem = template_name.removesuffix(".jinja2")
+    return re.sub(r"{{.*}}", top_name, stem)
+
+
+@dataclass(frozen=True)
+class RtlOptions:
+    """Micro-architecture of the generated RTL, passed to the templates as
+    ``rtl``. The defaults generate the smallest logic."""
+
+    #: Readback words ORed by each node of the readback tree, or 0 to OR every
+    #: readable field in one flat block.
+    readback_radix: int = 0
+    #: Register stages in the readback tree, see readback_levels().
+    readback_stages: int = 0
+    #: Writes, and reads, issued before the master accepts their responses;
+    #: reads get one more per readback stage.
+    response_depth: int = 2
+    #: Separate read and write issue paths, so that a read and a write to
+    #: different registers can issue in the same cycle.
+    dual_issue: bool = False
+    #: Answer a register read straight from the readback register while no
+    #: other read response is waiting, one cycle earlier than through the
+    #: read response FIFO.
+    low_latency_reads: bool = False
+
+    def readback_levels(self, leaves: int) -> list:
+        """Return the ``(nodes, registered)`` levels of the readback tree over
+        ``leaves`` register words, from the leaves up to the root.
+
+        Each level ORs up to ``readback_radix`` nodes of the level below.
+        Up to ``readback_stages`` levels below the root get an output
+        register. They are spread evenly over the tree, counting the register
+        that follows the root on every read.
+        """
+        nodes = [leaves]
+        while nodes[-1] > 1:
+            nodes.append(-(-nodes[-1] // self.readback_radix))
+        # The levels and the register after the root are split into
+        # stages + 1 runs of about the same number of levels
+        steps = len(nodes)
+        runs = min(self.readback_stages, steps - 1) + 1
+        levels = []
+        for level, count in enumerate(nodes[:-1]):
+            levels.append((count, (level + 1) * runs // steps > level * runs // steps))
+        levels.append((nodes[-1], False))
+        return levels
+
+
+def render(
+    register_map: RegisterMap, template_names, env=None, stream=False, rtl=None
+):
+    """Render ``register_map`` with each of ``template_names``.
+
+    Yields ``(name, content)`` pairs in template order. All templates share
+    one Environment, so each template is compiled at most once. With
+    ``stream`` set, ``content`` is an iterator over the text chunks of
+    ``Template.generate()`` instead of one string. ``rtl`` are the
+    :class:`RtlOptions`, the defaults if None.
+    """
+    if env is None:
+        env = create_environment()
+    context = register_map.context()
+    context["rtl"] = RtlOptions() if rtl is None else rtl
+    for template_name in template_names:
+        with profiling.phase("template"):
+            template = env.get_template(template_name)
+        name = output_name(template_name, register_map.top_name)
+        if stream:
+            yield name, template.generate(context)
+        else:
+            yield name, template.render(context)
+
+
+def convert(top: AddrmapNode, template_name: str):
+    """Convert compiled node hierarchy to generator friendly format."""
+    from .model import build_register_map
+
+    register_map = build_register_map(top)
+    ((_, content),) = render(register_map, [template_name])
     return content
 
 
-def write_file(output_dir, content, name):
+class OutputPathError(OSError):
+    """Raised when an output path exists but is not of the expected type."""
+
+
+class _KeepExistingFile(Exception):
+    """Raised in a :func:`_replace_file` block to discard what was written and
+    leave the existing file untouched."""
+
+
+@contextlib.contextmanager
+def _replace_file(path, binary=False):
+    """Write ``path`` through a temporary file renamed over it on success.
+
+    Readers never observe a partially written file, and a failed write leaves
+    the previous content in place. The file is opened in text mode with UTF-8
+    and ``\\n`` newlines unless ``binary`` is set. Raise
+    :class:`_KeepExistingFile` in the block to drop the temporary file instead.
+    """
+    directory, name = os.path.split(path)
+    text_mode = {} if binary else {"encoding": "utf8", "newline": "\n"}
+    fd = tempfile.NamedTemporaryFile(
+        "wb" if binary else "w",
+        dir=directory,
+        prefix=f".{name}.",
+        suffix=".tmp",
+        delete=False,
+        **text_mode,
+    )
+    try:
+        with fd:
+            yield fd
+        # NamedTemporaryFile is private to the user; give the result the mode
+        # open() would have.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(fd.name, 0o666 & ~umask)
+        os.replace(fd.name, path)
+    except _KeepExistingFile:
+        os.remove(fd.name)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(fd.name)
+        raise
+
+
+def _file_has_content(path, data: bytes) -> bool:
+    """Return True if the file at ``path`` holds exactly ``data``."""
+    if os.path.getsize(path) != len(data):
+        return False
+    with open(path, "rb") as fd:
+        return fd.read() == data
+
+
+def write_file(output_dir, content, name) -> bool:
+    """Write ``content`` to ``name`` in ``output_dir`` if it differs.
+
+    ``content`` is a string or an iterable of string chunks, such as a
+    streamed render from :func:`render`. Chunks are written to the temporary
+    file as they come, so the full text is never held in memory, and compared
+    with the existing output afterwards. An output that already holds
+    ``content`` is left untouched, so its modification time does not trigger
+    downstream rebuilds. Returns True if the file was written.
+    """
     output_dir = os.path.abspath(output_dir)
     if os.path.isdir(output_dir):
         logging.info(f'Folder "{output_dir}" already exists.')
     elif os.path.exists(output_dir):
         logging.error(f'File "{output_dir} already exists but is not a folder, abort.')
-        sys.exit(2)
+        raise OutputPathError(f'"{output_dir}" is not a folder')
     else:
         logging.info(f'Create folder "{output_dir}".')
         os.makedirs(output_dir, exist_ok=True)
 
     target_file = os.path.join(output_dir, name)
 
-    if os.path.isfile(target_file):
-        logging.info(f'File "{target_file}" already exists, it will be overwrite.')
+    exists = os.path.isfile(target_file)
+    if exists:
+        if isinstance(content, str) and _file_has_content(
+            target_file, content.encode("utf8")
+        ):
+            logging.info(f'File "{target_file}" is unchanged, keep it.')
+            return False
     elif os.path.exists(target_file):
         logging.error(
             f'File "{target_file}" already exists but is not a regular file, abort.'
         )
-        sys.exit(2)
+        raise OutputPathError(f'"{target_file}" is not a regular file')
+
+    if isinstance(content, str):
+        content = (content,)
+    written = True
+    with _replace_file(target_file) as fd:
+        fd.writelines(content)
+        if exists:
+            fd.flush()
+            if filecmp.cmp(fd.name, target_file, shallow=False):
+                logging.info(f'File "{target_file}" is unchanged, keep it.')
+                written = False
+                raise _KeepExistingFile
+            logging.info(f'File "{target_file}" already exists, it will be overwrite.')
+    return written
+
+
+@dataclass(frozen=True)
+class GenerationOptions:
+    """Settings shared by every design generated in one run."""
+
+    #: Template file names to render, e.g. ``{{axi4l}}_regs.v.jinja2``.
+    template_names: tuple
+    #: Print the model hierarchy of each design.
+    print_model: bool = False
+    #: Levels of the hierarchy to print, None for all, see print_hierarchy().
+    print_depth: int | None = None
+    #: Dotted path patterns of the subtrees to print, see print_hierarchy().
+    print_filters: tuple = ()
+    #: Print the hierarchy as JSON lines instead of text.
+    print_json: bool = False
+    #: Regenerate even if the output manifest says outputs are up to date.
+    force: bool = False
+    #: Reuse register maps from the on-disk model cache, see load_cached_model().
+    model_cache: bool = False
+    #: Keep register arrays rolled, see build_register_map().
+    rolled_arrays: bool = False
+    #: Root-level addrmaps to elaborate, see compile_tops().
+    top_names: tuple = ()
+    #: Elaborate every root-level addrmap, see compile_tops().
+    all_tops: bool = False
+    #: Paths of the addrmaps to generate, see build_register_maps().
+    selections: tuple = ()
+    #: Worker processes rendering the outputs of a design, see render_parallel().
+    render_jobs: int = 1
+    #: Micro-architecture of the generated RTL.
+    rtl: RtlOptions = RtlOptions()
+
+
+# Manifests live in this subdirectory of the output folder, one per design.
+MANIFEST_DIR = ".bus-generator"
+
+
+def _hash_file(path) -> str:
+    with open(path, "rb") as fd:
+        return hashlib.file_digest(fd, "sha256").hexdigest()
+
+
+def manifest_path(output_dir, input_files) -> str:
+    """Return the manifest file of the design made of ``input_files``."""
+    key = "\0".join(os.path.abspath(input_file) for input_file in input_files)
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(output_dir, MANIFEST_DIR, digest + ".json")
+
+
+def _manifest_settings(options: GenerationOptions) -> dict:
+    """Return the manifest entries that depend on the tool, not the design."""
+    return {
+        "version": package_version(),
+        "rolled_arrays": options.rolled_arrays,
+        "top_names": list(options.top_names),
+        "all_tops": options.all_tops,
+        "selections": list(options.selections),
+        "rtl": asdict(options.rtl),
+        "templates": {
+            name: _hash_file(os.path.join(TEMPLATES_DIR, name))
+            for name in options.template_names
+        },
+    }
+
+
+def read_manifest(output_dir, input_files) -> dict | None:
+    """Return the manifest of the design made of ``input_files``, or None."""
+    try:
+        with open(manifest_path(output_dir, input_files), encoding="utf8") as fd:
+            return json.load(fd)
+    except (OSError, ValueError):
+        return None
+
 
-    with open(target_file, mode="w", encoding="utf8", newline="\n") as fd:
-        fd.write(content)
+def manifest_is_current(output_dir, input_files, options: GenerationOptions) -> bool:
+    """Return True if the outputs of a design need no regeneration.
+
+    That is the case when the manifest written by the previous run records the
+    same tool version, templates and source hashes, and all recorded outputs
+    still exist.
+    """
+    manifest = read_manifest(output_dir, input_files)
+    if manifest is None:
+        return False
+    try:
+        if manifest["settings"] != _manifest_settings(options):
+            return False
+        for source, digest in manifest["sources"].items():
+            if _hash_file(source) != digest:
+                return False
+        return all(
+            os.path.isfile(os.path.join(output_dir, name))
+            for name in manifest["outputs"]
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+
+def write_manifest(output_dir, input_files, options: GenerationOptions, sources, outputs):
+    """Record what the outputs of a design were generated from."""
+    manifest = {
+        "settings": _manifest_settings(options),
+        "sources": {source: _hash_file(source) for source in sources},
+        "outputs": list(outputs),
+    }
+    path = manifest_path(output_dir, input_files)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _replace_file(path) as fd:
+        json.dump(manifest, fd, indent=2)
+
+
+# Bump when RegisterMap or its records change, to invalidate cached models.
+MODEL_CACHE_FORMAT = 6
+
+
+def model_cache_path(input_files, options: GenerationOptions) -> str:
+    """Return the model cache entry of the design made of ``input_files``.
+
+    Rolled and unrolled models of a design, and the models of different tops
+    and selections, are separate entries.
+    """
+    import systemrdl
+
+    key = json.dumps(
+        [
+            MODEL_CACHE_FORMAT,
+            systemrdl.__version__,
+            [os.path.abspath(input_file) for input_file in input_files],
+            options.rolled_arrays,
+            list(options.top_names),
+            options.all_tops,
+            list(options.selections),
+        ]
+    )
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return os.path.join(user_cache_dir(), package_version(), "models", digest + ".pickle")
+
+
+def load_cached_model(input_files, options: GenerationOptions):
+    """Return the cached ``(register_maps, sources)`` of a design, or None.
+
+    An entry is only used if every source it was compiled from, including
+    ``include``d files, still has the recorded hash. Entries are keyed by the
+    input files, the SystemRDL compiler version and this package version.
+    """
+    try:
+        with open(model_cache_path(input_files, options), "rb") as fd:
+            entry = pickle.load(fd)
+        for source, digest in entry["sources"].items():
+            if _hash_file(source) != digest:
+                return None
+        return entry["register_maps"], list(entry["sources"])
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+        return None
+
+
+def store_cached_model(input_files, options: GenerationOptions, sources, register_maps):
+    """Save the register maps of a design for :func:`load_cached_model`."""
+    path = model_cache_path(input_files, options)
+    entry = {
+        "sources": {source: _hash_file(source) for source in sources},
+        "register_maps": register_maps,
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _replace_file(path, binary=True) as fd:
+            pickle.dump(entry, fd, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as error:
+        logging.debug(f'Model cache "{path}" is unavailable: {error}')
+
+
+def generate_design(input_files, output_dir, options: GenerationOptions, env):
+    """Compile one design and render its templates into ``output_dir``.
+
+    The templates are rendered once for each top addrmap, see
+    :func:`compile_tops`, or once for each addrmap in ``options.selections``.
+    If the output manifest shows that nothing changed since the last run, the
+    design is not even compiled. With ``options.model_cache``, an unchanged
+    design is rendered from its cached register maps. Returns the absolute
+    path of every source file of the design. Compiler, data width, selection
+    and output path errors propagate to the caller.
+    """
+    profiling.count("designs")
+    if output_dir is not None and not options.force and not options.print_model:
+        with profiling.phase("manifest"):
+            current = manifest_is_current(output_dir, input_files, options)
+        if current:
+            logging.info(f'Outputs in "{output_dir}" are up to date.')
+            return list(read_manifest(output_dir, input_files)["sources"])
+
+    # The hierarchy printer needs the elaborated design, not just the model
+    cached = None
+    if options.model_cache and not options.print_model:
+        with profiling.phase("model cache"):
+            cached = load_cached_model(input_files, options)
+    if cached is not None:
+        logging.info("Use cached register model.")
+        register_maps, sources = cached
+    else:
+        with profiling.phase("import"):
+            from .model import build_register_maps, compile_tops, print_hierarchy
+
+        tops, sources = compile_tops(
+            input_files, options.top_names, options.all_tops
+        )
+        if options.print_model:
+            for top in tops:
+                print_hierarchy(
+                    top,
+                    max_depth=options.print_depth,
+                    patterns=options.print_filters,
+                    json_lines=options.print_json,
+                    validate=output_dir is None,
+                    rolled=options.rolled_arrays,
+                )
+        # Printing alone only walks and checks the printed part of the design
+        if output_dir is None:
+            return sources
+        register_maps = build_register_maps(
+            tops, options.selections, options.rolled_arrays
+        )
+        if options.model_cache:
+            with profiling.phase("model cache"):
+                store_cached_model(input_files, options, sources, register_maps)
+    for register_map in register_maps:
+        profiling.count("fields", len(register_map.fields))
+        profiling.count("registers", len(register_map.regs))
+        profiling.count("memories", len(register_map.mems))
+
+        for warning in register_map.warnings:
+            logging.warning("%s", warning)
+
+    # Render templates
+    if options.render_jobs > 1 and len(register_maps) * len(options.template_names) > 1:
+        outputs = render_parallel(
+            register_maps,
+            options.template_names,
+            output_dir,
+            env,
+            options.render_jobs,
+            options.rtl,
+        )
+    else:
+        outputs = []
+        for register_map in register_maps:
+            for name, chunks in render(
+                register_map, options.template_names, env, True, options.rtl
+            ):
+                _write_output(output_dir, name, chunks)
+                outputs.append(name)
+    profiling.count("outputs", len(outputs))
+    with profiling.phase("manifest"):
+        write_manifest(output_dir, input_files, options, sources, outputs)
+    return sources
+
+
+def _write_output(output_dir, name, chunks):
+    """Write the streamed render ``chunks`` of output ``name``."""
+    # Stream each output to its file, so large maps are never rendered into
+    # one string. Rendering is lazy, so it is timed separately inside "write"
+    with profiling.phase("write"):
+        write_file(output_dir, profiling.timed_text(chunks, "render"), name)
+    if profiling.active():
+        profiling.count(
+            "output bytes", os.path.getsize(os.path.join(output_dir, name))
+        )
+
+
+# Register maps of a render_parallel() worker process, see _init_render_worker().
+_worker_register_maps = None
+
+
+def _init_render_worker(ir, cache, verbosity, profile):
+    global _worker_register_maps
+    _init_design_worker(cache, verbosity, profile)
+    with profiling.phase("ir"):
+        _worker_register_maps = pickle.loads(ir)
+
+
+def _render_worker(job):
+    """Render and write one ``(map_index, template_name, output_dir, rtl)``
+    output in a worker process.
+
+    Returns the output name, what the render printed and logged, and the
+    profile snapshot, like :func:`_design_worker`.
+    """
+    index, template_name, output_dir, rtl = job
+    with _captured_output() as (stdout, stderr):
+        ((name, chunks),) = render(
+            _worker_register_maps[index], [template_name], _worker_env, True, rtl
+        )
+        _write_output(output_dir, name, chunks)
+    return name, stdout.getvalue(), stderr.getvalue(), _worker_snapshot()
+
+
+def render_parallel(
+    register_maps, template_names, output_dir, env, jobs, rtl=None
+) -> list:
+    """Render every template of every register map into ``output_dir`` in up
+    to ``jobs`` worker processes.
+
+    The register maps are pickled once, and each worker loads them once.
+    Every output is rendered and written by one worker, with the same code as
+    the serial path, so the files are byte-identical to a serial run. Messages
+    are replayed, and output names returned, in serial order. Errors of a
+    worker propagate to the caller. ``rtl`` are passed to :func:`render`.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    tasks = [
+        (index, template_name, output_dir, rtl)
+        for index in range(len(register_maps))
+        for template_name in template_names
+    ]
+    with profiling.phase("ir"):
+        ir = pickle.dumps(register_maps, protocol=pickle.HIGHEST_PROTOCOL)
+    executor = ProcessPoolExecutor(
+        max_workers=min(jobs, len(tasks)),
+        initializer=_init_render_worker,
+        initargs=(
+            ir,
+            env.bytecode_cache is not None,
+            logging.getLogger().level,
+            profiling.active() is not None,
+        ),
+    )
+    outputs = []
+    with executor:
+        for name, stdout, stderr in map(
+            _merge_profile, executor.map(_render_worker, tasks)
+        ):
+            sys.stdout.write(stdout)
+            sys.stderr.write(stderr)
+            outputs.append(name)
+    return outputs
+
+
+def _try_generate_design(input_files, output_dir, options, env):
+    """Generate one design; return the error message, or None on success."""
+    try:
+        generate_design(input_files, output_dir, options, env)
+    except Exception as error:
+        return str(error)
+    return None
+
+
+# Environment of a generate_designs() worker process, see _init_design_worker().
+_worker_env = None
+
+
+def _init_design_worker(cache, verbosity, profile):
+    global _worker_env
+    if profile:
+        profiling.enable()
+    with profiling.phase("environment"):
+        _worker_env = create_environment(cache=cache)
+    logging.getLogger().setLevel(verbosity)
+
+
+def _design_worker(job):
+    """Generate one ``(input_files, output_dir, options)`` design in a worker
+    process.
+
+    Everything the design prints or logs is captured and returned with the
+    result, so the parent can replay it in design order. With profiling
+    enabled, the phases of the design are returned too, see
+    :meth:`profiling.Profile.snapshot`.
+    """
+    input_files, output_dir, options = job
+    with _captured_output() as (stdout, stderr):
+        error = _try_generate_design(input_files, output_dir, options, _worker_env)
+    return error, stdout.getvalue(), stderr.getvalue(), _worker_snapshot()
+
+
+@contextlib.contextmanager
+def _captured_output():
+    """Capture what is printed and logged in the block into the two yielded
+    ``(stdout, stderr)`` StringIO objects."""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    handler = logging.StreamHandler(stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root_logger = logging.getLogger()
+    saved_handlers = root_logger.handlers
+    root_logger.handlers = [handler]
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            yield stdout, stderr
+    finally:
+        root_logger.handlers = saved_handlers
+
+
+def _worker_snapshot():
+    """Return the profile snapshot of the last job of a worker process and
+    start a new profile for the next, or None without profiling."""
+    profile = profiling.active()
+    if profile is None:
+        return None
+    profiling.enable()
+    return profile.snapshot()
+
+
+def generate_designs(designs, options: GenerationOptions, env, jobs=1) -> int:
+    """Generate each ``(input_files, output_dir)`` design.
+
+    A failing design is reported and skipped so the remaining designs are
+    still generated. With ``jobs`` above one, designs are spread over that
+    many worker processes; their output and messages are still reported in
+    design order, so the result does not depend on the worker count. Designs
+    must not write to the same output file. Returns the number of failed
+    designs.
+    """
+    if jobs > 1 and len(designs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(
+            max_workers=min(jobs, len(designs)),
+            initializer=_init_design_worker,
+            initargs=(
+                env.bytecode_cache is not None,
+                logging.getLogger().level,
+                profiling.active() is not None,
+            ),
+        )
+        with executor:
+            results = executor.map(
+                _design_worker,
+                [
+                    (input_files, output_dir, options)
+                    for input_files, output_dir in designs
+                ],
+            )
+            return _report_designs(designs, map(_merge_profile, results))
+
+    results = (
+        (_try_generate_design(input_files, output_dir, options, env), "", "")
+        for input_files, output_dir in designs
+    )
+    return _report_designs(designs, results)
+
+
+def _merge_profile(result):
+    """Add the profile of a _design_worker() result to the active profile and
+    return the rest of the result."""
+    *result, snapshot = result
+    if snapshot is not None:
+        profiling.active().merge(snapshot)
+    return result
+
+
+def _report_designs(designs, results) -> int:
+    """Report each design's ``(error, stdout, stderr)`` result in order."""
+    failures = 0
+    for (input_files, output_dir), (error, stdout, stderr) in zip(designs, results):
+        sys.stdout.write(stdout)
+        sys.stderr.write(stderr)
+        label = f'{",".join(input_files)} -> {output_dir}'
+        if error is not None:
+            failures += 1
+            logging.error(f"Design {label} failed: {error}")
+            print(f"FAILED {label}")
+        else:
+            print(f"ok     {label}")
+    if failures:
+        print(f"{failures} of {len(designs)} design(s) failed")
+    return failures
+
+
+def _source_state(paths) -> dict:
+    """Return the modification time and size of each of ``paths``."""
+    state = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            state[path] = None
+        else:
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def watch_designs(designs, options: GenerationOptions, env, interval=1.0):
+    """Generate each ``(input_files, output_dir)`` design, then regenerate it
+    whenever one of its sources changes, until interrupted.
+
+    The sources of every design, including ``include``d files, are polled
+    every ``interval`` seconds. The process stays resident with its templates
+    compiled, so a change only costs compiling and rendering the designs that
+    read the changed file. The latency of every regeneration is printed, and
+    a failing design is reported and watched again.
+    """
+    # Sources and their state, per design; None until generated once
+    watched = [None] * len(designs)
+    try:
+        while True:
+            for index, (input_files, output_dir) in enumerate(designs):
+                if watched[index] is None:
+                    sources = [os.path.abspath(path) for path in input_files]
+                else:
+                    sources = list(watched[index])
+                    if _source_state(sources) == watched[index]:
+                        continue
+                # Take the state before generating, so a file saved meanwhile
+                # is picked up by the next poll
+                state = _source_state(sources)
+                label = f'{",".join(input_files)} -> {output_dir}'
+                start = time.perf_counter()
+                try:
+                    sources = generate_design(input_files, output_dir, options, env)
+                except Exception as error:
+                    logging.error(f"Design {label} failed: {error}")
+                    result = "FAILED"
+                else:
+                    result = "ok    "
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"{result} {label} in {elapsed:.0f} ms", flush=True)
+                watched[index] = _source_state(sources) | {
+                    path: state[path] for path in sources if path in state
+                }
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def _worker_count(jobs: int) -> int:
+    """Return the worker processes of a ``--jobs`` value, 0 meaning one per CPU."""
+    return jobs or os.process_cpu_count() or 1
 
 
 def cli(argv=None):
@@ -437,49 +1146,87 @@ def cli(argv=None):
 
     logging.basicConfig(
         level=args.verbosity,
-        format="%(levelname)s: %(funcName)s(): L%(lineno)d: %(message)s",
+        format=LOG_FORMAT,
     )
     logging.debug(f"Python version: {sys.version.split()[0]}")
-    logging.debug(f"Script version: {__version__}")
+    logging.debug(f"Script version: {package_version()}")
     logging.debug(f"Arguments: {vars(args)}")
 
-    # Collect input files from the command line arguments
-    input_files = args.input
+    profile = profiling.enable() if args.profile else None
+    profiler = None
+    if args.profile_output:
+        import cProfile
 
-    # Create an instance of the compiler
-    rdlc = RDLCompiler()
+        profiler = cProfile.Profile()
+        profiler.enable()
     try:
-        # Compile all the files provided
-        for input_file in input_files:
-            rdlc.compile_file(input_file)
-        # Elaborate the design
-        root = rdlc.elaborate()
-        top = root.top
-    except RuntimeError:
-        # A compilation error occurred. Exit with error code
-        sys.exit(1)
+        _run(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile_output)
+        if profile is not None:
+            profile.report()
+            profiling.disable()
+
+
+def _run(args: argparse.Namespace):
+    """Generate what the parsed command line ``args`` ask for."""
+    # All designs share one Environment, so templates are compiled only once
+    templates = discover_templates()
+    options = GenerationOptions(
+        template_names=tuple(templates[alias] + ".jinja2" for alias in args.templates),
+        print_model=args.print,
+        print_depth=args.print_depth,
+        print_filters=tuple(args.print_filters),
+        print_json=args.print_format == "jsonl",
+        force=args.force,
+        model_cache=args.model_cache and args.cache,
+        rolled_arrays=args.rolled_arrays,
+        top_names=tuple(args.top_names),
+        all_tops=args.all_tops,
+        selections=tuple(args.selections),
+        render_jobs=_worker_count(args.render_jobs),
+        rtl=RtlOptions(
+            readback_radix=args.readback_radix,
+            readback_stages=args.readback_stages,
+            response_depth=args.response_depth,
+            dual_issue=args.dual_issue,
+            low_latency_reads=args.low_latency_reads,
+        ),
+    )
+    with profiling.phase("environment"):
+        env = create_environment(cache=args.cache)
+
+    if args.watch:
+        designs = args.designs or [(tuple(args.input), args.output)]
+        watch_designs(designs, options, env, args.interval)
+        return
+
+    if args.designs:
+        if generate_designs(args.designs, options, env, _worker_count(args.jobs)):
+            sys.exit(1)
+        return
+
+    with profiling.phase("import"):
+        from systemrdl import RDLCompileError
+
+        from .model import (
+            SelectionError,
+            UnsupportedArrayError,
+            UnsupportedDataWidthError,
+        )
 
     try:
-        validate_supported_data_widths(top)
-    except UnsupportedDataWidthError as error:
+        generate_design(args.input, args.output, options, env)
+    except (RDLCompileError, RuntimeError):
+        # A compilation error occurred. Exit with error code
+        sys.exit(1)
+    except (UnsupportedDataWidthError, UnsupportedArrayError, SelectionError) as error:
         logging.error("%s", error)
         sys.exit(1)
-
-    warn_unsupported_side_effects(top)
-
-    # Print
-    if args.print:
-        print_hierarchy(top)
-
-    # Render template
-    templates = discover_templates()
-    for alias in args.templates:
-        stem = templates[alias]
-        # Export a implementation
-        content = convert(top, template_name=stem + ".jinja2")
-        name = re.sub(r"{{.*}}", root.top.inst_name, stem)
-        if args.output is not None:
-            write_file(args.output, content, name)
+    except OutputPathError:
+        sys.exit(2)
 
 
 if __name__ == "__main__":
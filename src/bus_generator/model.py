@@ -0,0 +1,1028 @@
+"""SystemRDL register model extraction.
+
+This module imports the SystemRDL compiler, so the command line front end in
+:mod:`bus_generator.bus_generator` only loads it on the paths that compile or
+inspect a design.
+"""
+
+import functools
+import itertools
+import json
+import logging
+import operator
+import os
+import sys
+from array import array
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from math import ceil, log2, prod
+
+from systemrdl import RDLCompiler, RDLListener, RDLWalker, WalkerAction, component
+from systemrdl.node import (
+    AddressableNode,
+    AddrmapNode,
+    FieldNode,
+    MemNode,
+    Node,
+    RegfileNode,
+    RegNode,
+    SignalNode,
+    VectorNode,
+)
+from systemrdl.rdltypes import AccessType
+
+from . import profiling
+
+# Also resolved from bus_generator.bus_generator, see its __getattr__()
+__all__ = [
+    "ADDR_WIDTH_LSB",
+    "ArrayShape",
+    "DATA_WIDTH",
+    "DataWidthValidationListener",
+    "FieldTable",
+    "FieldsGatheringListener",
+    "GeneralListener",
+    "MemGatheringListener",
+    "MemTable",
+    "ModelGatheringListener",
+    "ModelPrintingListener",
+    "RegTable",
+    "RegisterMap",
+    "RegistersGatheringListener",
+    "SelectionError",
+    "UnsupportedArrayError",
+    "UnsupportedDataWidthError",
+    "UnsupportedSideEffectWarningListener",
+    "WstrbCase",
+    "build_register_map",
+    "build_register_maps",
+    "compile_design",
+    "compile_tops",
+    "extract_model",
+    "print_hierarchy",
+    "select_addrmap",
+    "validate_supported_data_widths",
+    "warn_unsupported_side_effects",
+]
+
+# AXI4-Lite bus geometry assumed by the generated Verilog.
+DATA_WIDTH = 32
+ADDR_WIDTH_LSB = 2
+
+
+class GeneralListener(RDLListener):
+    """General walker listener.
+
+    Addresses are relative to the addrmap the walk starts at, so that a
+    nested addrmap can be generated on its own.
+    """
+
+    def __init__(self):
+        self._address = 0
+        self._base = 0
+        self._path = []
+        self._root_addrmap = None
+        self._addr_width = 1
+        self._data_width = DATA_WIDTH
+
+    def enter_Component(self, node: Node):
+        if isinstance(node, AddrmapNode):
+            self._addr_width = ceil(log2(node.total_size))
+            if self._root_addrmap is None:
+                self._root_addrmap = node
+                self._base = node.absolute_address
+            else:
+                self._path.append(node.inst_name)
+        else:
+            self._path.append(node.inst_name)
+
+    def exit_Component(self, node: Node):
+        if node is not self._root_addrmap:
+            self._path.pop()
+
+    def enter_AddressableComponent(self, node: AddressableNode):
+        self._address = node.absolute_address - self._base
+        if node.current_idx and node is not self._root_addrmap:
+            for c in node.current_idx:
+                self._path[-1] += "_" + str(c)
+
+
+class ModelPrintingListener(GeneralListener):
+    """Listener used to print node hierarchy.
+
+    Lines are collected and written to ``file`` in batches. ``max_depth``
+    limits the levels printed below the top, and ``patterns`` limits the output
+    to the subtrees whose dotted path matches one of the shell-style patterns
+    (see :func:`print_hierarchy`). Both prune the walk, so the nodes they leave
+    out are never visited. With ``json_lines``, every node is written as one
+    JSON object per line instead of an indented text line.
+    """
+
+    # Lines buffered before each write
+    BATCH = 4096
+
+    def __init__(self, file=None, max_depth=None, patterns=(), json_lines=False):
+        super().__init__()
+        self._file = sys.stdout if file is None else file
+        self._max_depth = max_depth
+        self._json_lines = json_lines
+        self._lines = []
+        # [patterns, line] of every node being visited. patterns is None once
+        # the node matched a whole pattern, else the patterns that may still
+        # match below it; line is the node's line until it is written
+        self._visits = []
+        # Number of leading visits whose line was written or dropped
+        self._written = 0
+        self._patterns = [tuple(pattern.split(".")) for pattern in patterns] or None
+        self._names = []
+
+    def enter_Component(self, node: Node):
+        super().enter_Component(node)
+        name = node.inst_name
+        if isinstance(node, AddressableNode) and node.current_idx:
+            name += "".join(f"_{i}" for i in node.current_idx)
+        self._names.append(name)
+        depth = len(self._names) - 1
+
+        patterns = self._visits[-1][0] if self._visits else self._patterns
+        if patterns is not None:
+            patterns = [
+                pattern
+                for pattern in patterns
+                if depth < len(pattern) and fnmatchcase(name, pattern[depth])
+            ]
+            if not patterns:
+                self._visits.append([[], None])
+                return WalkerAction.SkipDescendants
+            if any(len(pattern) == depth + 1 for pattern in patterns):
+                patterns = None
+
+        self._visits.append([patterns, self._format(node, depth)])
+        # Matching nodes are written with the ancestors that lead to them
+        if patterns is None:
+            self._write_pending()
+        if self._max_depth is not None and depth >= self._max_depth:
+            return WalkerAction.SkipDescendants
+        return None
+
+    def exit_Component(self, node: Node):
+        super().exit_Component(node)
+        self._names.pop()
+        self._visits.pop()
+        self._written = min(self._written, len(self._visits))
+
+    def _write_pending(self):
+        for visit in self._visits[self._written :]:
+            self._lines.append(visit[1])
+            visit[1] = None
+        self._written = len(self._visits)
+        if len(self._lines) >= self.BATCH:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered lines."""
+        self._file.write("".join(self._lines))
+        self._lines.clear()
+
+    def _format(self, node: Node, depth: int) -> str:
+        if self._json_lines:
+            return json.dumps(self._record(node, depth)) + "\n"
+        line = "\t" * depth + f"{node.inst_name} "
+        if isinstance(node, AddressableNode):
+            line += f"@{hex(node.absolute_address)}({hex(node.address_offset)}) "
+        if isinstance(node, VectorNode):
+            line += f"[{node.high}:{node.low}] "
+        if isinstance(node, (AddrmapNode, RegfileNode)):
+            return line + f"{_node_type(node)}, size: {node.size}\n"
+        if isinstance(node, MemNode):
+            return line + (
+                f"mem, sw: {node.get_property('sw').name}, size: {node.size}\n"
+            )
+        if isinstance(node, FieldNode):
+            return line + (
+                f"field, sw: {node.get_property('sw').name}, "
+                f"hw: {node.get_property('hw').name}\n"
+            )
+        return line + _node_type(node) + "\n"
+
+    def _record(self, node: Node, depth: int) -> dict:
+        record = {
+            "path": ".".join(self._names),
+            "depth": depth,
+            "type": _node_type(node),
+            "name": node.inst_name,
+        }
+        if isinstance(node, AddressableNode):
+            if node.current_idx:
+                record["index"] = list(node.current_idx)
+            record["address"] = node.absolute_address
+            record["offset"] = node.address_offset
+            record["size"] = node.size
+        if isinstance(node, VectorNode):
+            record["msb"] = node.high
+            record["lsb"] = node.low
+        if isinstance(node, (FieldNode, MemNode)):
+            record["sw"] = node.get_property("sw").name
+        if isinstance(node, FieldNode):
+            record["hw"] = node.get_property("hw").name
+        return record
+
+
+def _node_type(node: Node) -> str:
+    """Return the SystemRDL component keyword of ``node``, e.g. ``reg``."""
+    for node_type, keyword in (
+        (AddrmapNode, "addrmap"),
+        (RegfileNode, "regfile"),
+        (RegNode, "reg"),
+        (MemNode, "mem"),
+        (FieldNode, "field"),
+        (SignalNode, "signal"),
+    ):
+        if isinstance(node, node_type):
+            return keyword
+    return type(node).__name__
+
+
+def _side_effect_warning(node: FieldNode | MemNode) -> str | None:
+    """Describe side-effect semantics of ``node`` that cannot be represented."""
+    if isinstance(node, MemNode):
+        sw = node.get_property("sw")
+        if sw in {AccessType.rw1, AccessType.w1}:
+            return (
+                "Ignoring unsupported SystemRDL side-effect semantics on memory "
+                "'%s': sw=%s (write-once)" % (node.get_path(), sw.name)
+            )
+        return None
+
+    ignored_semantics = []
+
+    onread = node.get_property("onread")
+    if onread is not None:
+        ignored_semantics.append(f"onread={onread.name}")
+
+    onwrite = node.get_property("onwrite")
+    if onwrite is not None:
+        ignored_semantics.append(f"onwrite={onwrite.name}")
+
+    sw = node.get_property("sw")
+    if sw in {AccessType.rw1, AccessType.w1}:
+        ignored_semantics.append(f"sw={sw.name} (write-once)")
+
+    if ignored_semantics:
+        return (
+            "Ignoring unsupported SystemRDL side-effect semantics on field "
+            "'%s': %s" % (node.get_path(), ", ".join(ignored_semantics))
+        )
+    return None
+
+
+class UnsupportedSideEffectWarningListener(RDLListener):
+    """Warn when field side-effect semantics cannot be represented in RTL."""
+
+    def enter_Field(self, node: FieldNode):
+        warning = _side_effect_warning(node)
+        if warning:
+            logging.warning("%s", warning)
+
+    def enter_Mem(self, node: MemNode):
+        warning = _side_effect_warning(node)
+        if warning:
+            logging.warning("%s", warning)
+
+
+def warn_unsupported_side_effects(top: AddrmapNode):
+    """Emit compatibility warnings for unsupported field side effects."""
+    RDLWalker(unroll=True).walk(top, UnsupportedSideEffectWarningListener())
+
+
+class UnsupportedDataWidthError(ValueError):
+    """Raised when an RDL component cannot fit the fixed AXI data bus."""
+
+
+class SelectionError(ValueError):
+    """Raised when a selected path does not name an addrmap of the design."""
+
+
+class UnsupportedArrayError(ValueError):
+    """Raised when a component cannot be generated as a rolled array."""
+
+
+def _data_width_errors(node: FieldNode | MemNode) -> list:
+    """Describe why ``node`` cannot be represented on the AXI data bus."""
+    if isinstance(node, MemNode):
+        width = node.get_property("memwidth")
+        if width > DATA_WIDTH:
+            return [
+                "Memory '%s' has memwidth %d, which exceeds the fixed %d-bit "
+                "DATA_WIDTH."
+                % (node.get_path(), width, DATA_WIDTH)
+            ]
+        return []
+
+    width = node.high - node.low + 1
+    if width > DATA_WIDTH:
+        return [
+            "Field '%s' is %d bits wide ([%d:%d]); it exceeds the fixed "
+            "%d-bit DATA_WIDTH."
+            % (node.get_path(), width, node.high, node.low, DATA_WIDTH)
+        ]
+    if node.high >= DATA_WIDTH:
+        return [
+            "Field '%s' uses bits [%d:%d], which do not fit the fixed "
+            "%d-bit DATA_WIDTH."
+            % (node.get_path(), node.high, node.low, DATA_WIDTH)
+        ]
+    return []
+
+
+class DataWidthValidationListener(RDLListener):
+    """Collect RDL components that cannot be represented on the AXI data bus.
+
+    With ``rolled``, memories inside arrays are collected in ``array_errors``,
+    like :func:`extract_model` does for rolled arrays.
+    """
+
+    def __init__(self, rolled: bool = False):
+        self.errors = []
+        self.array_errors = []
+        self.rolled = rolled
+        self._arrays = 0
+
+    def enter_AddressableComponent(self, node: AddressableNode):
+        self._arrays += node.is_array
+
+    def exit_AddressableComponent(self, node: AddressableNode):
+        self._arrays -= node.is_array
+
+    def enter_Field(self, node: FieldNode):
+        self.errors.extend(_data_width_errors(node))
+
+    def enter_Mem(self, node: MemNode):
+        self.errors.extend(_data_width_errors(node))
+        if self.rolled and self._arrays:
+            self.array_errors.append(
+                "Memory '%s' is in an array, which cannot be generated with "
+                "rolled arrays." % node.get_path()
+            )
+
+
+def validate_supported_data_widths(top: AddrmapNode):
+    """Reject RDL widths that the fixed 32-bit AXI4-Lite RTL cannot represent."""
+    listener = DataWidthValidationListener()
+    RDLWalker(unroll=True).walk(top, listener)
+    if listener.errors:
+        raise UnsupportedDataWidthError("\n".join(listener.errors))
+
+
+@dataclass(frozen=True, slots=True)
+class WstrbCase:
+    """Write strobe bit of one byte lane of a field and the field bits in it."""
+
+    be: int
+    mask: int
+
+
+@functools.cache
+def _wstrb_cases(low: int, high: int) -> tuple:
+    """Return the :class:`WstrbCase` of each byte lane of bits ``high:low``.
+
+    Fields with the same bit range share one tuple.
+    """
+    mask = 2 ** (high + 1) - 2**low
+    return tuple(
+        WstrbCase(be=1 << byte, mask=mask & (0xFF << (byte * 8)))
+        for byte in range(low // 8, high // 8 + 1)
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class ArrayShape:
+    """Geometry of a rolled register array.
+
+    ``dims`` and ``strides`` give the size and address stride of every array
+    dimension, outermost first; nested arrays are flattened into one shape.
+    Elements are numbered in row-major order, the last dimension varying
+    fastest, which is also the order the unrolled walk visits them in;
+    ``element_strides`` is the step of each dimension in that numbering.
+    """
+
+    dims: tuple
+    strides: tuple
+    count: int
+    element_strides: tuple
+
+
+@functools.cache
+def _array_shape(dims: tuple, strides: tuple) -> ArrayShape:
+    """Return the :class:`ArrayShape` of ``dims`` and ``strides``.
+
+    Registers and fields of the same array share one shape.
+    """
+    return ArrayShape(
+        dims=dims,
+        strides=strides,
+        count=prod(dims),
+        element_strides=_element_strides(dims),
+    )
+
+
+def _element_strides(dims: tuple) -> tuple:
+    return tuple(prod(dims[k + 1 :]) for k in range(len(dims)))
+
+
+class _Row:
+    """Read-only view of one row of a :class:`_Table`.
+
+    Each column of the table is an attribute of the row, so templates read a
+    row like a record. Rows are created on access and hold no values.
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in self._table.row_names()
+        )
+        return f"{type(self).__qualname__}({values})"
+
+
+def _column_property(name):
+    return property(lambda row: getattr(row._table, name)[row._index])
+
+
+def _flag_property(bit):
+    return property(lambda row: bool(row._table.flags[row._index] & bit))
+
+
+class _Table:
+    """Columnar table of the template records of one kind of component.
+
+    Numbers are kept in :class:`array.array` columns and text in lists, so a
+    row costs a few bytes per column instead of a Python object. Columns
+    derived from others are computed over the whole table on first use.
+    Indexing or iterating a table yields :class:`_Row` views.
+    """
+
+    #: Stored columns: name -> array typecode, or None for a list.
+    COLUMNS = {}
+    #: Boolean columns, stored as the bits of the ``flags`` column.
+    FLAGS = ()
+    #: Columns computed from the stored ones by a cached property.
+    DERIVED = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        properties = {
+            name: _column_property(name) for name in (*cls.COLUMNS, *cls.DERIVED)
+        }
+        properties.update(
+            (name, _flag_property(1 << bit)) for bit, name in enumerate(cls.FLAGS)
+        )
+        cls.Row = type("Row", (_Row,), {"__slots__": (), **properties})
+        cls.Row.__qualname__ = f"{cls.__name__}.Row"
+
+    def __init__(self):
+        for name, typecode in self.COLUMNS.items():
+            setattr(self, name, [] if typecode is None else array(typecode))
+        self.flags = array("B")
+
+    @classmethod
+    def row_names(cls) -> tuple:
+        """Return the attribute names of a row."""
+        return (*cls.COLUMNS, *cls.DERIVED, *cls.FLAGS)
+
+    def _append(self, **values):
+        for name in self.COLUMNS:
+            getattr(self, name).append(values[name])
+        self.flags.append(
+            sum(1 << bit for bit, name in enumerate(self.FLAGS) if values[name])
+        )
+
+    def _stored(self) -> tuple:
+        return tuple(getattr(self, name) for name in (*self.COLUMNS, "flags"))
+
+    def __len__(self):
+        return len(self.flags)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.Row(self, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"{type(self).__name__} index out of range")
+        return self.Row(self, index)
+
+    def __iter__(self):
+        return map(self.Row, itertools.repeat(self), range(len(self)))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._stored() == other._stored()
+
+
+class FieldTable(_Table):
+    """Columnar table of fields.
+
+    Fields must fit the data bus (see :func:`_data_width_errors`), as masks and
+    reset values are stored in 64-bit columns.
+    """
+
+    COLUMNS = {
+        "name": None,
+        "desc": None,
+        "hierarchy": None,
+        "address": "Q",
+        "reset": "Q",
+        "high": "H",
+        "low": "H",
+        "msb": "H",
+        "lsb": "H",
+        "sw": None,
+        "array": None,
+        "reg_name": None,
+    }
+    FLAGS = (
+        "implements_storage",
+        "is_sw_writable",
+        "is_sw_readable",
+        "is_hw_writable",
+        "is_hw_readable",
+    )
+    DERIVED = (
+        "aligned_address",
+        "width",
+        "mask",
+        "wstrb_cases",
+        "address_is_sw_writable",
+        "address_is_sw_readable",
+    )
+
+    def add(self, node: FieldNode, path: list, address: int, array=None):
+        """Append a field of the register at ``address``.
+
+        A field of a rolled register array is appended once with the
+        :class:`ArrayShape` of the array; ``address`` is then the address of
+        the first element.
+        """
+        reg_name = "_".join(path[:-1])
+        # The fields of a register are added in a row; share its name
+        if self.reg_name and self.reg_name[-1] == reg_name:
+            reg_name = self.reg_name[-1]
+        self._append(
+            name="_".join(path),
+            desc=node.get_property("desc"),
+            hierarchy=".".join(path),
+            address=address,
+            reset=node.get_property("reset") or 0,
+            high=node.high,
+            low=node.low,
+            msb=node.msb,
+            lsb=node.lsb,
+            sw=node.get_property("sw").name,
+            array=array,
+            reg_name=reg_name,
+            implements_storage=node.implements_storage,
+            is_sw_writable=node.is_sw_writable,
+            is_sw_readable=node.is_sw_readable,
+            is_hw_writable=node.is_hw_writable,
+            is_hw_readable=node.is_hw_readable,
+        )
+
+    @functools.cached_property
+    def aligned_address(self):
+        return array("Q", map(operator.rshift, self.address, itertools.repeat(2)))
+
+    @functools.cached_property
+    def width(self):
+        return array("H", [high - low + 1 for high, low in zip(self.high, self.low)])
+
+    @functools.cached_property
+    def mask(self):
+        return array(
+            "Q", [(2 << high) - (1 << low) for high, low in zip(self.high, self.low)]
+        )
+
+    @functools.cached_property
+    def wstrb_cases(self):
+        return list(map(_wstrb_cases, self.low, self.high))
+
+    # Whether any field at the address of each field, the field itself
+    # included, is software writable or readable.
+
+    @functools.cached_property
+    def address_is_sw_writable(self):
+        return self._any_at_address("is_sw_writable")
+
+    @functools.cached_property
+    def address_is_sw_readable(self):
+        return self._any_at_address("is_sw_readable")
+
+    def _any_at_address(self, flag: str):
+        bit = 1 << self.FLAGS.index(flag)
+        addresses = {
+            address for address, flags in zip(self.address, self.flags) if flags & bit
+        }
+        return array("B", [address in addresses for address in self.address])
+
+
+class RegTable(_Table):
+    """Columnar table of registers."""
+
+    COLUMNS = {"name": None, "hierarchy": None, "address": "Q", "array": None}
+    FLAGS = ("has_sw_writable", "has_sw_readable", "has_hw_writable", "has_hw_readable")
+    DERIVED = ("aligned_address",)
+
+    def add(self, node: RegNode, path: list, address: int, array=None):
+        """Append a register at ``address``, see :meth:`FieldTable.add`."""
+        self._append(
+            name="_".join(path),
+            hierarchy=".".join(path),
+            address=address,
+            array=array,
+            has_sw_writable=node.has_sw_writable,
+            has_sw_readable=node.has_sw_readable,
+            has_hw_writable=node.has_hw_writable,
+            has_hw_readable=node.has_hw_readable,
+        )
+
+    @functools.cached_property
+    def aligned_address(self):
+        return array("Q", map(operator.rshift, self.address, itertools.repeat(2)))
+
+
+class MemTable(_Table):
+    """Columnar table of external memories on a ``data_width`` bit bus."""
+
+    COLUMNS = {
+        "name": None,
+        "desc": None,
+        "hierarchy": None,
+        "address": "Q",
+        "size": "Q",
+        "mementries": "Q",
+        "width": "H",
+        "sw": None,
+    }
+    FLAGS = ("is_sw_writable", "is_sw_readable")
+    DERIVED = ("addr_width", "addr_msb", "addr_lsb")
+
+    def __init__(self, data_width: int = DATA_WIDTH):
+        super().__init__()
+        self.data_width = data_width
+
+    def add(self, node: MemNode, path: list, address: int):
+        """Append an external memory."""
+        self._append(
+            name="_".join(path),
+            desc=node.get_property("desc"),
+            hierarchy=".".join(path),
+            address=address,
+            size=node.size,
+            mementries=node.get_property("mementries"),
+            width=node.get_property("memwidth"),
+            sw=node.get_property("sw").name,
+            is_sw_writable=node.is_sw_writable,
+            is_sw_readable=node.is_sw_readable,
+        )
+
+    def _stored(self) -> tuple:
+        return (self.data_width, *super()._stored())
+
+    @functools.cached_property
+    def addr_msb(self):
+        return array("h", [ceil(log2(size)) - 1 for size in self.size])
+
+    @functools.cached_property
+    def addr_lsb(self):
+        return array("h", [ceil(log2(self.data_width / 8))] * len(self))
+
+    @functools.cached_property
+    def addr_width(self):
+        return array(
+            "h", [msb + 1 - lsb for msb, lsb in zip(self.addr_msb, self.addr_lsb)]
+        )
+
+
+class FieldsGatheringListener(GeneralListener):
+    def __init__(self):
+        super().__init__()
+        self.fields = FieldTable()
+
+    def exit_Field(self, node: FieldNode):
+        self.fields.add(node, self._path, self._address)
+
+
+class MemGatheringListener(GeneralListener):
+    def __init__(self):
+        super().__init__()
+        self.mems = MemTable(self._data_width)
+
+    def exit_Mem(self, node: MemNode):
+        self.mems.add(node, self._path, node.absolute_address - self._base)
+
+
+class RegistersGatheringListener(GeneralListener):
+    def __init__(self):
+        super().__init__()
+        self.regs = RegTable()
+
+    def exit_Reg(self, node: RegNode):
+        self.regs.add(node, self._path, self._address)
+
+
+class ModelGatheringListener(GeneralListener):
+    """Gather the register model of :func:`extract_model` in a single walk.
+
+    Collects the field, register and memory records together with data width
+    errors and unsupported side-effect warnings, so the tree is only
+    traversed once per design.
+
+    With ``rolled`` set the tree must be walked without unrolling; every array
+    is then gathered once, its fields and registers carrying the dimensions
+    and address strides of all the arrays they are nested in.
+    """
+
+    def __init__(self, rolled: bool = False):
+        super().__init__()
+        self.rolled = rolled
+        self.fields = FieldTable()
+        self.regs = RegTable()
+        self.mems = MemTable(self._data_width)
+        self.errors = []
+        self.array_errors = []
+        self.warnings = []
+        self._array = None
+        self._array_stack = []
+        self._raw_base = 0
+        self.nodes = 0
+
+    def enter_Component(self, node: Node):
+        super().enter_Component(node)
+        self.nodes += 1
+
+    def enter_AddressableComponent(self, node: AddressableNode):
+        if not self.rolled:
+            super().enter_AddressableComponent(node)
+            return
+        # Array elements have no absolute address of their own, so track the
+        # first element and the stride of every enclosing dimension instead.
+        # The walked addrmap may itself be one element of an array: its raw
+        # address is the base, and it is not an array of the generated map.
+        self._array_stack.append(self._array)
+        if node is self._root_addrmap:
+            self._raw_base = node.raw_absolute_address
+        elif node.is_array:
+            dims = tuple(node.array_dimensions)
+            strides = tuple(node.array_stride * step for step in _element_strides(dims))
+            if self._array:
+                dims = self._array.dims + dims
+                strides = self._array.strides + strides
+            self._array = _array_shape(dims, strides)
+        self._address = node.raw_absolute_address - self._raw_base
+
+    def exit_AddressableComponent(self, node: AddressableNode):
+        if self.rolled:
+            self._array = self._array_stack.pop()
+
+    def enter_Field(self, node: FieldNode):
+        self.errors.extend(_data_width_errors(node))
+        warning = _side_effect_warning(node)
+        if warning:
+            self.warnings.append(warning)
+
+    def enter_Mem(self, node: MemNode):
+        self.errors.extend(_data_width_errors(node))
+        warning = _side_effect_warning(node)
+        if warning:
+            self.warnings.append(warning)
+        if self._array:
+            self.array_errors.append(
+                "Memory '%s' is in an array, which cannot be generated with "
+                "rolled arrays." % node.get_path()
+            )
+
+    # Once a width error is found the model is rejected, so stop gathering
+    # rows; an oversized field may not fit the table columns.
+
+    def exit_Field(self, node: FieldNode):
+        if not self.errors:
+            self.fields.add(node, self._path, self._address, self._array)
+
+    def exit_Reg(self, node: RegNode):
+        if not self.errors:
+            self.regs.add(node, self._path, self._address, self._array)
+
+    def exit_Mem(self, node: MemNode):
+        if not self.errors and not self.array_errors:
+            self.mems.add(node, self._path, node.absolute_address - self._base)
+
+
+def extract_model(top: AddrmapNode, rolled: bool = False) -> ModelGatheringListener:
+    """Walk ``top`` once and return the gathered model.
+
+    Register arrays are unrolled into one record per element unless ``rolled``
+    is set. Raises :class:`UnsupportedDataWidthError` if any component cannot
+    fit the fixed AXI data bus, and :class:`UnsupportedArrayError` if a rolled
+    array cannot be generated. Side-effect warnings are left in ``warnings``
+    for the caller to report.
+    """
+    listener = ModelGatheringListener(rolled)
+    with profiling.phase("walk"):
+        RDLWalker(unroll=not rolled).walk(top, listener)
+    profiling.count("nodes", listener.nodes)
+    if listener.errors:
+        raise UnsupportedDataWidthError("\n".join(listener.errors))
+    if listener.array_errors:
+        raise UnsupportedArrayError("\n".join(listener.array_errors))
+    return listener
+
+
+def compile_tops(input_files, top_names=(), all_tops: bool = False) -> tuple:
+    """Compile ``input_files`` into one compiler and elaborate one or more tops.
+
+    ``top_names`` are the root-level addrmap definitions to elaborate, and
+    ``all_tops`` elaborates every one of them in definition order. By default,
+    the last addrmap defined is the top. All tops are elaborated from the same
+    parsed definitions, so the files are compiled only once.
+
+    Returns the list of elaborated tops and the absolute path of every source
+    file that was read, including files pulled in with ``include``.
+    """
+    rdlc = RDLCompiler()
+    sources = []
+    for input_file in input_files:
+        with profiling.phase("compile"):
+            file_info = rdlc.compile_file(input_file)
+        sources.append(os.path.abspath(input_file))
+        sources.extend(os.path.abspath(path) for path in file_info.included_files)
+    if all_tops:
+        top_names = [
+            name
+            for name, definition in rdlc.root.comp_defs.items()
+            if isinstance(definition, component.Addrmap)
+        ]
+    with profiling.phase("elaborate"):
+        if top_names:
+            tops = [rdlc.elaborate(name).top for name in top_names]
+        else:
+            tops = [rdlc.elaborate().top]
+    return tops, list(dict.fromkeys(sources))
+
+
+def compile_design(input_files) -> tuple:
+    """Compile ``input_files`` into one compiler and elaborate the design.
+
+    Returns the elaborated top and the absolute path of every source file that
+    was read, including files pulled in with ``include``.
+    """
+    (top,), sources = compile_tops(input_files)
+    return top, sources
+
+
+def print_hierarchy(
+    top: AddrmapNode,
+    file=None,
+    max_depth=None,
+    patterns=(),
+    json_lines=False,
+    validate=False,
+    rolled=False,
+):
+    """Print compiled hierarchy for node.
+
+    Only the nodes at most ``max_depth`` levels below ``top`` are printed. Given
+    ``patterns``, only the subtrees whose dotted path, such as
+    ``top.block_1.ctrl``, matches one of them are printed, under the ancestors
+    that lead to them. Each pattern is split at the dots and every level is
+    matched with :func:`fnmatch.fnmatchcase`, so ``top.block_*.ctrl`` prints the
+    ``ctrl`` node of every ``block`` array element. Array elements are named
+    ``<name>_<index>``. Nodes outside the limits are skipped, not walked. With
+    ``json_lines``, each node is printed as a JSON object on its own line.
+
+    With ``validate``, the printed nodes are also checked against the limits of
+    :func:`extract_model` with ``rolled``, and the same errors are raised once
+    they are printed.
+    """
+    walker = RDLWalker(unroll=True)
+    listener = ModelPrintingListener(file, max_depth, patterns, json_lines)
+    # The walker follows the last listener, so the validator only sees the
+    # nodes that the printer visits
+    validator = DataWidthValidationListener(rolled)
+    listeners = (validator, listener) if validate else (listener,)
+    with profiling.phase("print"):
+        try:
+            walker.walk(top, *listeners)
+        finally:
+            listener.flush()
+    if validator.errors:
+        raise UnsupportedDataWidthError("\n".join(validator.errors))
+    if validator.array_errors:
+        raise UnsupportedArrayError("\n".join(validator.array_errors))
+
+
+@dataclass
+class RegisterMap:
+    """Template-ready intermediate representation of one elaborated addrmap.
+
+    Built once per design by :func:`build_register_map` and shared by every
+    template rendered from it.
+    """
+
+    top_name: str
+    addr_width: int
+    fields: FieldTable
+    regs: RegTable
+    mems: MemTable
+    warnings: list = field(default_factory=list)
+
+    def context(self) -> dict:
+        """Return the variables passed to the Jinja2 templates."""
+        return {
+            "top_name": self.top_name,
+            "addr_width": self.addr_width,
+            "addr_width_lsb": ADDR_WIDTH_LSB,
+            "data_width": DATA_WIDTH,
+            "fields": self.fields,
+            "regs": self.regs,
+            "mems": self.mems,
+        }
+
+
+def build_register_map(top: AddrmapNode, rolled: bool = False) -> RegisterMap:
+    """Extract the :class:`RegisterMap` of ``top`` in a single walk.
+
+    ``top`` may be nested in a larger design, see :func:`select_addrmap`; the
+    map is then generated as a block of its own, addressed from zero. See
+    :func:`extract_model` for ``rolled``.
+    """
+    model = extract_model(top, rolled)
+    return RegisterMap(
+        top_name=top.inst_name + "".join(f"_{i}" for i in top.current_idx or ()),
+        addr_width=ceil(log2(top.size)),
+        fields=model.fields,
+        regs=model.regs,
+        mems=model.mems,
+        warnings=model.warnings,
+    )
+
+
+def select_addrmap(top: AddrmapNode, path: str) -> AddrmapNode:
+    """Return the addrmap at the dotted ``path`` in the design of ``top``.
+
+    The path starts with the name of ``top`` and names array elements with
+    their index, e.g. ``soc.dma[1].ctrl``. Raises :class:`SelectionError` if
+    it names no addrmap, or a whole array.
+    """
+    name, _, rest = path.partition(".")
+    try:
+        node = top.find_by_path(rest) if rest else top
+    except (ValueError, IndexError) as error:
+        raise SelectionError(f"Cannot select '{path}': {error}") from error
+    if name != top.inst_name or node is None:
+        raise SelectionError(f"Cannot select '{path}': no such node.")
+    if not isinstance(node, AddrmapNode):
+        raise SelectionError(f"Cannot select '{path}': it is not an addrmap.")
+    if node.is_array and node.current_idx is None:
+        raise SelectionError(
+            f"Cannot select '{path}': it is an array, select one element."
+        )
+    return node
+
+
+def build_register_maps(tops, selections=(), rolled: bool = False) -> list:
+    """Return the :class:`RegisterMap` of each addrmap at the ``selections``
+    paths, see :func:`select_addrmap`, or of each of ``tops`` if there are
+    none.
+
+    A path selects from the top it starts with. Only the selected subtrees
+    are walked. Raises :class:`SelectionError` if two addrmaps would generate
+    modules of the same name.
+    """
+    if selections:
+        tops_by_name = {top.inst_name: top for top in tops}
+        nodes = [
+            select_addrmap(tops_by_name.get(path.partition(".")[0], tops[0]), path)
+            for path in selections
+        ]
+    else:
+        nodes = tops
+        selections = [top.inst_name for top in tops]
+    register_maps = []
+    paths = {}
+    for path, node in zip(selections, nodes):
+        register_map = build_register_map(node, rolled)
+        if register_map.top_name in paths:
+            raise SelectionError(
+                f"Cannot select both '{paths[register_map.top_name]}' and "
+                f"'{path}': they generate the same module "
+                f"'{register_map.top_name}'."
+            )
+        paths[register_map.top_name] = path
+        register_maps.append(register_map)
+    return register_maps
@@ -0,0 +1,187 @@
+"""Phase timing for ``--profile``.
+
+Code that does measurable work wraps it in :func:`phase`. While a profile is
+active (see :func:`enable`), the wall time, CPU time and peak resident set
+size of every phase are recorded, together with the counters added with
+:func:`count`. Phases may nest; a phase is only charged for the time not
+spent in the phases nested in it, so the phases add up to the profiled run.
+Without an active profile every function here is a no-op.
+"""
+
+import contextlib
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss() -> int:
+    """Return the peak resident set size of this process in bytes, or 0."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Profile:
+    """Per-phase timings and counters of one run."""
+
+    def __init__(self):
+        #: Phase name -> [calls, wall seconds, CPU seconds, peak RSS bytes].
+        self.phases = {}
+        #: Counter name -> value.
+        self.counts = {}
+        self.start = time.perf_counter()
+        # [wall, cpu, nested wall, nested cpu] of each running phase
+        self._running = []
+
+    def enter(self):
+        self._running.append([time.perf_counter(), time.process_time(), 0.0, 0.0])
+
+    def exit(self, name: str):
+        start_wall, start_cpu, nested_wall, nested_cpu = self._running.pop()
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        self.charge(name, wall, cpu, nested_wall, nested_cpu)
+
+    def charge(self, name, wall, cpu, nested_wall=0.0, nested_cpu=0.0):
+        """Record one call of phase ``name`` that took ``wall`` and ``cpu``
+        seconds, of which ``nested_wall`` and ``nested_cpu`` were spent in
+        nested phases."""
+        if self._running:
+            self._running[-1][2] += wall
+            self._running[-1][3] += cpu
+        self.add(name, 1, wall - nested_wall, cpu - nested_cpu, peak_rss())
+
+    def add(self, name: str, calls: int, wall: float, cpu: float, rss: int):
+        entry = self.phases.setdefault(name, [0, 0.0, 0.0, 0])
+        entry[0] += calls
+        entry[1] += wall
+        entry[2] += cpu
+        entry[3] = max(entry[3], rss)
+
+    def snapshot(self) -> dict:
+        """Return the phases and counters in a picklable form for
+        :meth:`merge`."""
+        return {"phases": self.phases, "counts": self.counts}
+
+    def merge(self, snapshot: dict):
+        """Add the phases and counters of another profile, e.g. of a worker
+        process."""
+        for name, entry in snapshot["phases"].items():
+            self.add(name, *entry)
+        for name, value in snapshot["counts"].items():
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def report(self, file=None):
+        """Print a table of the phases and the counters."""
+        file = sys.stderr if file is None else file
+        total = time.perf_counter() - self.start
+        rows = [(name, *entry) for name, entry in self.phases.items()]
+        accounted = sum(row[2] for row in rows)
+        rows.append(("(other)", 0, max(total - accounted, 0.0), 0.0, 0))
+        print(
+            f"{'phase':<16}{'calls':>7}{'wall ms':>11}{'cpu ms':>11}"
+            f"{'peak RSS MiB':>14}",
+            file=file,
+        )
+        for name, calls, wall, cpu, rss in rows:
+            cpu_ms = f"{cpu * 1000:.1f}" if calls else ""
+            rss_mib = f"{rss / 2**20:.1f}" if rss else ""
+            print(
+                f"{name:<16}{calls or '':>7}{wall * 1000:>11.1f}{cpu_ms:>11}"
+                f"{rss_mib:>14}",
+                file=file,
+            )
+        print(
+            f"{'total':<16}{'':>7}{total * 1000:>11.1f}{'':>11}"
+            f"{peak_rss() / 2**20:>14.1f}",
+            file=file,
+        )
+        if self.counts:
+            print(
+                ", ".join(f"{name} {value}" for name, value in self.counts.items()),
+                file=file,
+            )
+
+
+_active = None
+
+
+def enable() -> Profile:
+    """Start profiling this process and return the active :class:`Profile`."""
+    global _active
+    _active = Profile()
+    return _active
+
+
+def disable():
+    """Stop profiling this process."""
+    global _active
+    _active = None
+
+
+def active() -> Profile | None:
+    """Return the active :class:`Profile`, or None."""
+    return _active
+
+
+@contextlib.contextmanager
+def _timed_phase(profile, name):
+    profile.enter()
+    try:
+        yield
+    finally:
+        profile.exit(name)
+
+
+def phase(name: str):
+    """Return a context manager that records its body as phase ``name``."""
+    if _active is None:
+        return contextlib.nullcontext()
+    return _timed_phase(_active, name)
+
+
+def timed_text(chunks, name: str, batch: int = 65536):
+    """Return the text ``chunks``, recording the time spent producing them as
+    one call of phase ``name``.
+
+    Used for lazily produced content, such as streamed template output. While
+    profiling, the chunks are joined into pieces of about ``batch``
+    characters, so timing millions of tiny chunks costs little.
+    """
+    if _active is None:
+        return chunks
+    return _timed_text(_active, iter(chunks), name, batch)
+
+
+def _timed_text(profile, chunks, name, batch):
+    wall = cpu = 0.0
+    try:
+        while True:
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            pending = []
+            size = 0
+            for chunk in chunks:
+                pending.append(chunk)
+                size += len(chunk)
+                if size >= batch:
+                    break
+            text = "".join(pending)
+            wall += time.perf_counter() - start_wall
+            cpu += time.process_time() - start_cpu
+            if not text:
+                return
+            yield text
+    finally:
+        profile.charge(name, wall, cpu)
+
+
+def count(name: str, value: int = 1):
+    """Add ``value`` to counter ``name``."""
+    if _active is not None:
+        _active.counts[name] = _active.counts.get(name, 0) + value
@@ -7,13 +7,16 @@ one ``@cocotb.test`` case from this module. Cocotb owns pass/fail;
 times out.
 
 Sources are read from the ``generated/`` tree so manual edits to the RTL survive
-a re-run. Select Icarus, Verilator, or Questa with ``SIM=icarus``,
+a re-run. ``test_stress_rtl_options`` instead renders each sample with
+non-default generator options into a temporary directory and runs every stress
+case on that RTL. Select Icarus, Verilator, or Questa with ``SIM=icarus``,
 ``SIM=verilator``, ``SIM=questa``, ``SIM=iverilog`` (an alias for Icarus), or
 ``SIM=vsim`` (an alias for Questa).
 ``SIM`` is required and the selected simulator executables must be available.
 Tests may skip when ``cocotb_tools`` or the generated DUT is missing.
 """
 
+import itertools
 import os
 import random
 import shutil
@@ -22,7 +25,12 @@ from pathlib import Path
 
 import cocotb
 import pytest
-from bus_generator.bus_generator import FieldsGatheringListener, MemGatheringListener
+from bus_generator import main
+from bus_generator.bus_generator import (
+    FieldsGatheringListener,
+    MemGatheringListener,
+    build_register_map,
+)
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge, SimTimeoutError, with_timeout
 from simulator_support import (
@@ -45,6 +53,81 @@ SAMPLES = [
     pytest.param("simple", id="simple"),
     pytest.param("wstrb", id="wstrb"),
 ]
+STRESS_CASES = [
+    "stress_random_axi",
+    "stress_write_overlap",
+    "stress_read_overlap",
+    "stress_mixed_overlap",
+    "same_register_read_write_order",
+]
+# (sample, generator options) rendered and stressed by test_stress_rtl_options
+RTL_VARIANTS = [
+    pytest.param("arrays", [], id="arrays"),
+    pytest.param("arrays", ["--rolled-arrays"], id="arrays-rolled"),
+    # As many stages as tree levels, so even the leaves are registered
+    pytest.param(
+        "arrays",
+        ["--readback-radix", "2", "--readback-stages", "8"],
+        id="arrays-readback-registered-leaves",
+    ),
+    pytest.param(
+        "ram",
+        ["--readback-radix", "2", "--readback-stages", "8"],
+        id="ram-readback-registered-leaves",
+    ),
+    pytest.param(
+        "mem_access",
+        ["--readback-radix", "4", "--readback-stages", "1"],
+        id="mem_access-readback",
+    ),
+    pytest.param(
+        "arrays",
+        ["--rolled-arrays", "--readback-radix", "3", "--readback-stages", "2"],
+        id="arrays-rolled-readback",
+    ),
+    pytest.param("mem_access", ["--response-depth", "1"], id="mem_access-depth-1"),
+    pytest.param("simple", ["--response-depth", "1"], id="simple-depth-1"),
+    pytest.param("ram", ["--response-depth", "5"], id="ram-depth-5"),
+    pytest.param(
+        "gpio",
+        ["--response-depth", "1", "--readback-radix", "2", "--readback-stages", "1"],
+        id="gpio-depth-1-readback",
+    ),
+    pytest.param("simple", ["--dual-issue"], id="simple-dual-issue"),
+    pytest.param("mem_access", ["--dual-issue"], id="mem_access-dual-issue"),
+    pytest.param("ram", ["--dual-issue"], id="ram-dual-issue"),
+    pytest.param(
+        "arrays", ["--rolled-arrays", "--dual-issue"], id="arrays-rolled-dual-issue"
+    ),
+    pytest.param("simple", ["--low-latency-reads"], id="simple-low-latency"),
+    pytest.param("mem_access", ["--low-latency-reads"], id="mem_access-low-latency"),
+    pytest.param(
+        "mem_access",
+        [
+            "--dual-issue",
+            "--low-latency-reads",
+            "--readback-radix",
+            "2",
+            "--readback-stages",
+            "2",
+        ],
+        id="mem_access-dual-issue-low-latency-readback",
+    ),
+    pytest.param(
+        "arrays",
+        [
+            "--dual-issue",
+            "--low-latency-reads",
+            "--readback-radix",
+            "2",
+            "--readback-stages",
+            "8",
+            "--response-depth",
+            "1",
+        ],
+        id="arrays-dual-issue-low-latency-readback",
+    ),
+]
 
 
 def _random_wstrb():
@@ -73,25 +156,33 @@ MEM_READ_LATENCY_MAX = 6
 
 
 class RdlStressModel:
-    def __init__(self, top):
+    def __init__(self, top, rolled=False):
         fields, mems = _load_rdl_metadata(top)
         self.regs = {}
-        self.mems = {m["name"]: [0] * m["mementries"] for m in mems}
-        self.hw_fields = [f for f in fields if f["is_hw_writable"]]
+        self.mems = {m.name: [0] * m.mementries for m in mems}
+        self.hw_fields = [f for f in fields if f.is_hw_writable]
+        # With rolled arrays, each array field has one flattened input vector
+        self.rolled_hw_fields = []
+        if rolled:
+            self.rolled_hw_fields = [
+                f
+                for f in build_register_map(_compile_top(top), rolled=True).fields
+                if f.is_hw_writable
+            ]
         self.mem_specs = mems
 
         for field in fields:
-            addr = field["address"]
+            addr = field.address
             reg = self.regs.setdefault(
                 addr,
                 {"value": 0, "read_mask": 0, "write_mask": 0},
             )
-            reset = (field["reset"] << field["low"]) & field["mask"]
-            reg["value"] = (reg["value"] & ~field["mask"]) | reset
-            if field["is_sw_readable"]:
-                reg["read_mask"] |= field["mask"]
-            if field["is_sw_writable"]:
-                reg["write_mask"] |= field["mask"]
+            reset = (field.reset << field.low) & field.mask
+            reg["value"] = (reg["value"] & ~field.mask) | reset
+            if field.is_sw_readable:
+                reg["read_mask"] |= field.mask
+            if field.is_sw_writable:
+                reg["write_mask"] |= field.mask
 
         self.read_ops = []
         self.write_ops = []
@@ -102,11 +193,11 @@ class RdlStressModel:
                 self.write_ops.append({"kind": "reg", "addr": addr})
 
         for mem in mems:
-            for idx in range(mem["mementries"]):
-                op = {"kind": "mem", "addr": mem["address"] + idx * 4, "mem": mem, "idx": idx}
-                if mem["is_sw_readable"]:
+            for idx in range(mem.mementries):
+                op = {"kind": "mem", "addr": mem.address + idx * 4, "mem": mem, "idx": idx}
+                if mem.is_sw_readable:
                     self.read_ops.append(op)
-                if mem["is_sw_writable"]:
+                if mem.is_sw_writable:
                     self.write_ops.append(op)
 
     def write(self, op, data, wstrb, dut):
@@ -119,24 +210,45 @@ class RdlStressModel:
             self.drive_hw_inputs(dut)
         else:
             mem = op["mem"]
-            mask = _wstrb_to_mask(wstrb, mem["width"])
-            value = self.mems[mem["name"]][op["idx"]]
-            self.mems[mem["name"]][op["idx"]] = (value & ~mask) | (data & mask)
+            mask = _wstrb_to_mask(wstrb, mem.width)
+            value = self.mems[mem.name][op["idx"]]
+            self.mems[mem.name][op["idx"]] = (value & ~mask) | (data & mask)
 
     def expected_read(self, op):
         if op["kind"] == "reg":
             reg = self.regs[op["addr"]]
             return reg["value"] & reg["read_mask"], reg["read_mask"]
         mem = op["mem"]
-        mask = (1 << mem["width"]) - 1
-        return self.mems[mem["name"]][op["idx"]] & mask, mask
+        mask = (1 << mem.width) - 1
+        return self.mems[mem.name][op["idx"]] & mask, mask
 
     def drive_hw_inputs(self, dut):
+        if self.rolled_hw_fields:
+            self._drive_rolled_hw_inputs(dut)
+            return
         for field in self.hw_fields:
-            sig = getattr(dut, f"{field['name']}_in", None)
+            sig = getattr(dut, f"{field.name}_in", None)
             if sig is None:
                 continue
-            value = (self.regs[field["address"]]["value"] & field["mask"]) >> field["low"]
+            value = (self.regs[field.address]["value"] & field.mask) >> field.low
+            sig.value = value
+
+    def _drive_rolled_hw_inputs(self, dut):
+        for field in self.rolled_hw_fields:
+            sig = getattr(dut, f"{field.name}_in", None)
+            if sig is None:
+                continue
+            addresses = [field.address]
+            if field.array is not None:
+                # Elements in row-major order, element k at [k*width +: width]
+                addresses = [
+                    field.address + sum(i * s for i, s in zip(index, field.array.strides))
+                    for index in itertools.product(*map(range, field.array.dims))
+                ]
+            value = 0
+            for k, addr in enumerate(addresses):
+                element = (self.regs[addr]["value"] & field.mask) >> field.low
+                value |= element << (k * field.width)
             sig.value = value
 
 
@@ -144,16 +256,16 @@ class ExternalMemoryModel:
     def __init__(self, dut, mem, values):
         self.clk = dut.s_axi_aclk
         self.resetn = dut.s_axi_aresetn
-        self.addr = getattr(dut, f"{mem['name']}_addr")
-        self.en = getattr(dut, f"{mem['name']}_en")
-        self.we = getattr(dut, f"{mem['name']}_we")
-        self.be = getattr(dut, f"{mem['name']}_be")
-        self.din = getattr(dut, f"{mem['name']}_din")
-        self.dout = getattr(dut, f"{mem['name']}_dout")
-        self.valid = getattr(dut, f"{mem['name']}_valid")
+        self.addr = getattr(dut, f"{mem.name}_addr")
+        self.en = getattr(dut, f"{mem.name}_en")
+        self.we = getattr(dut, f"{mem.name}_we")
+        self.be = getattr(dut, f"{mem.name}_be")
+        self.din = getattr(dut, f"{mem.name}_din")
+        self.dout = getattr(dut, f"{mem.name}_dout")
+        self.valid = getattr(dut, f"{mem.name}_valid")
         self.values = values
-        self.mask = (1 << mem["width"]) - 1
-        seed = SEED ^ sum(ord(c) for c in mem["name"])
+        self.mask = (1 << mem.width) - 1
+        seed = SEED ^ sum(ord(c) for c in mem.name)
         self.random = random.Random(seed)
 
     async def run(self):
@@ -458,17 +570,21 @@ class PipelinedReadMaster:
                     break
 
 
-def _load_rdl_metadata(top):
+def _compile_top(top):
     rdlc = RDLCompiler()
     rdlc.compile_file(str(TESTS_DIR / f"{top}.rdl"))
-    root = rdlc.elaborate()
+    return rdlc.elaborate().top
+
+
+def _load_rdl_metadata(top):
+    node = _compile_top(top)
     walker = RDLWalker(unroll=True)
 
     field_listener = FieldsGatheringListener()
-    walker.walk(root.top, field_listener)
+    walker.walk(node, field_listener)
 
     mem_listener = MemGatheringListener()
-    walker.walk(root.top, mem_listener)
+    walker.walk(node, mem_listener)
 
     return field_listener.fields, mem_listener.mems
 
@@ -481,10 +597,19 @@ def _stress_top(dut):
     return name[: -len("_regs")] if name.endswith("_regs") else name
 
 
+def _stress_options():
+    """Return the generator options of the RTL under test, see RTL_VARIANTS."""
+    return os.environ.get("STRESS_OPTIONS", "").split()
+
+
+def _stress_model(top):
+    return RdlStressModel(top, rolled="--rolled-arrays" in _stress_options())
+
+
 def _start_memory_models(dut, model):
     tasks = []
     for mem in model.mem_specs:
-        memory = ExternalMemoryModel(dut, mem, model.mems[mem["name"]])
+        memory = ExternalMemoryModel(dut, mem, model.mems[mem.name])
         tasks.append(cocotb.start_soon(memory.run()))
     return tasks
 
@@ -492,7 +617,7 @@ def _start_memory_models(dut, model):
 async def _setup_stress(dut, seed, master_cls):
     random.seed(seed)
     top = _stress_top(dut)
-    model = RdlStressModel(top)
+    model = _stress_model(top)
     cocotb.start_soon(Clock(dut.s_axi_aclk, 10, units="ns").start())
     _start_memory_models(dut, model)
     dut.s_axi_aresetn.value = 0
@@ -620,7 +745,7 @@ async def stress_read_overlap(dut):
 async def stress_mixed_overlap(dut):
     random.seed(SEED_MIXED)
     top = _stress_top(dut)
-    model = RdlStressModel(top)
+    model = _stress_model(top)
     cocotb.start_soon(Clock(dut.s_axi_aclk, 10, units="ns").start())
     _start_memory_models(dut, model)
     dut.s_axi_aresetn.value = 0
@@ -717,14 +842,114 @@ async def stress_mixed_overlap(dut):
     )
 
 
-def _run_cocotb_test(top, testcase):
+async def _read_write_pair(dut, addr, data, lead):
+    """Present a write of ``data`` to ``addr`` and, ``lead`` cycles later, a
+    read of ``addr``. Returns the read data once both responses arrived."""
+    clk = dut.s_axi_aclk
+    dut.s_axi_bready.value = 1
+    dut.s_axi_rready.value = 1
+    dut.s_axi_awaddr.value = addr
+    dut.s_axi_wdata.value = data
+    dut.s_axi_wstrb.value = STRB_MASK
+    dut.s_axi_awvalid.value = 1
+    dut.s_axi_wvalid.value = 1
+    channels = [
+        (dut.s_axi_awvalid, dut.s_axi_awready),
+        (dut.s_axi_wvalid, dut.s_axi_wready),
+        (dut.s_axi_arvalid, dut.s_axi_arready),
+    ]
+    cycle = 0
+    written = False
+    rdata = None
+    while not written or rdata is None:
+        if cycle == lead:
+            dut.s_axi_araddr.value = addr
+            dut.s_axi_arvalid.value = 1
+        await RisingEdge(clk)
+        cycle += 1
+        for valid, ready in channels:
+            if int(valid.value) == 1 and int(ready.value) == 1:
+                valid.value = 0
+        if int(dut.s_axi_bvalid.value) == 1:
+            written = True
+        if int(dut.s_axi_rvalid.value) == 1:
+            rdata = int(dut.s_axi_rdata.value)
+    dut.s_axi_bready.value = 0
+    dut.s_axi_rready.value = 0
+    return rdata
+
+
+@cocotb.test(timeout_time=1, timeout_unit="ms")
+async def same_register_read_write_order(dut):
+    """A read and a write of one register issue in a defined order.
+
+    A read presented in the same cycle as a write reaches the issue stage
+    first. A write presented one cycle earlier meets the read there; the read
+    goes first after reset or a write, the write after a read. The order is
+    the same with and without --dual-issue.
+    """
+    top, model, master = await _setup_stress(dut, SEED, AxiLiteMaster)
+
+    hw_masks = {}
+    for field in model.hw_fields:
+        hw_masks[field.address] = hw_masks.get(field.address, 0) | field.mask
+    # Only compare the bits that software writes and hardware leaves alone
+    candidates = [
+        (op, reg["write_mask"] & reg["read_mask"] & ~hw_masks.get(op["addr"], 0))
+        for op in model.write_ops
+        if op["kind"] == "reg"
+        for reg in [model.regs[op["addr"]]]
+    ]
+    candidates = [(op, mask) for op, mask in candidates if mask]
+    if not candidates:
+        dut._log.info(f"{top} has no register that software reads and writes")
+        return
+    op, mask = candidates[0]
+    addr = op["addr"]
+
+    # (access before the pair, cycles the write leads the read, read sees the write)
+    cases = [
+        (None, 1, False),
+        ("read", 1, True),
+        ("write", 1, False),
+        ("read", 0, False),
+    ]
+    errors = 0
+    for before, lead, sees_write in cases:
+        if before == "read":
+            await master.read(addr)
+        elif before == "write":
+            data = random.getrandbits(DATA_WIDTH)
+            model.write(op, data, STRB_MASK, dut)
+            await master.write(addr, data, STRB_MASK)
+        old = model.regs[addr]["value"]
+        data = old ^ DATA_MASK
+        rdata = await _read_write_pair(dut, addr, data, lead)
+        model.write(op, data, STRB_MASK, dut)
+        expected = model.regs[addr]["value"] if sees_write else old
+        if (rdata ^ expected) & mask:
+            errors += 1
+            dut._log.error(
+                f"after {before} with write lead {lead}: addr=0x{addr:02x} "
+                f"data=0x{rdata:08x} expected=0x{expected:08x} mask=0x{mask:08x}"
+            )
+
+    assert errors == 0, f"{errors}/{len(cases)} read/write pairs out of order"
+    dut._log.info(f"{top} read/write order passed at addr=0x{addr:02x}")
+
+
+def _run_cocotb_test(top, testcase, dut=None, build_dir="sim_build", options=()):
+    """Build ``dut`` (the generated RTL of ``top`` by default) and run the
+    cocotb ``testcase``, or list of cases, on it. ``options`` are the generator
+    options the RTL was rendered with."""
     try:
         sim = require_simulator(os.environ, shutil.which)
     except (RuntimeError, ValueError) as error:
         pytest.fail(str(error), pytrace=False)
     pytest.importorskip("cocotb_tools.runner")
 
-    dut = GENERATED / "axi4l" / f"{top}_regs.v"
+    if dut is None:
+        dut = GENERATED / "axi4l" / f"{top}_regs.v"
     if not dut.is_file():
         pytest.skip(f"missing {dut}; run `make artifacts` first")
 
@@ -738,22 +963,26 @@ def _run_cocotb_test(top, testcase):
         sources=[str(dut)],
         hdl_toplevel=hdl_toplevel,
         always=True,
+        build_dir=build_dir,
     )
 
-    old_top = os.environ.get("STRESS_TOP")
-    os.environ["STRESS_TOP"] = top
+    env = {"STRESS_TOP": top, "STRESS_OPTIONS": " ".join(options)}
+    old_env = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
     try:
         runner.test(
             test_module="test_stress",
             hdl_toplevel=hdl_toplevel,
             testcase=testcase,
             seed=0xC0FFEE,
+            build_dir=build_dir,
         )
     finally:
-        if old_top is None:
-            os.environ.pop("STRESS_TOP", None)
-        else:
-            os.environ["STRESS_TOP"] = old_top
+        for name, value in old_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
 
 
 @pytest.mark.sim
@@ -778,3 +1007,22 @@ def test_stress_read_overlap(top):
 @pytest.mark.parametrize("top", SAMPLES)
 def test_stress_mixed_overlap(top):
     _run_cocotb_test(top, "stress_mixed_overlap")
+
+
+@pytest.mark.sim
+@pytest.mark.parametrize("top", SAMPLES)
+def test_same_register_read_write_order(top):
+    _run_cocotb_test(top, "same_register_read_write_order")
+
+
+@pytest.mark.sim
+@pytest.mark.parametrize(("top", "options"), RTL_VARIANTS)
+def test_stress_rtl_options(top, options, tmp_path):
+    main([str(TESTS_DIR / f"{top}.rdl"), "-o", str(tmp_path), "-q", "--no-cache", *options])
+    _run_cocotb_test(
+        top,
+        STRESS_CASES,
+        dut=tmp_path / f"{top}_regs.v",
+        build_dir=tmp_path / "sim_build",
+        options=options,
+    )
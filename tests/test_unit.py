@@ -1,23 +1,47 @@
 #!/usr/bin/env python3
 """Pure-Python unit tests for the bus_generator CLI and internals."""
 
+import dataclasses
 import importlib
 import importlib.metadata
+import io
+import itertools
+import json
+import operator
+import os
+import pstats
+import re
 import subprocess
 import sys
+import tracemalloc
+from pathlib import Path
 
 import pytest
 
 from bus_generator import main
 import bus_generator.bus_generator as bus_generator_module
+import bus_generator.model
+from bus_generator import profiling
 from bus_generator.bus_generator import (
     FieldsGatheringListener,
     MemGatheringListener,
     RegistersGatheringListener,
+    RtlOptions,
+    SelectionError,
+    build_register_map,
+    build_register_maps,
+    compile_tops,
     convert,
+    create_environment,
     discover_templates,
+    extract_model,
+    manifest_path,
     parse_arguments,
+    print_hierarchy,
+    render,
+    select_addrmap,
     warn_unsupported_side_effects,
+    write_file,
 )
 from systemrdl import RDLCompiler, RDLWalker
 
@@ -27,6 +51,17 @@ MEM_ACCESS_RDL = "tests/mem_access.rdl"
 RAM_RDL = "tests/ram.rdl"
 SIMPLE_RDL = "tests/simple.rdl"
 SIDE_EFFECTS_RDL = "tests/side_effects.rdl"
+OVERSIZED_FIELD_RDL = "tests/oversized_field.rdl"
+ARRAYS_RDL = "tests/arrays.rdl"
+SELECT_RDL = "tests/select.rdl"
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache_dir(monkeypatch, tmp_path_factory):
+    # Keep persistent caches out of the user's real cache directory.
+    monkeypatch.setenv(
+        "BUS_GENERATOR_CACHE_DIR", str(tmp_path_factory.mktemp("cache"))
+    )
 
 
 def _compile(rdl_path):
@@ -189,6 +224,255 @@ def test_cli_generates_with_nested_output(tmp_path):
     assert result.stdout == ""
 
 
+def test_version_prints_package_version(capsys):
+    with pytest.raises(SystemExit) as e:
+        main(["--version"])
+    assert e.value.code == 0
+    assert capsys.readouterr().out == bus_generator_module.__version__ + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Startup cost (lazy imports)
+# ---------------------------------------------------------------------------
+
+HEAVY_MODULES = ("jinja2", "systemrdl", "concurrent.futures.process")
+
+
+def _imported_modules(*args):
+    """Run Python with ``-X importtime`` and return the names of the modules
+    the process imported. benchmarks/import_time.py measures the times."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return {
+        line.rpartition("|")[2].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        pytest.param(["-c", "import bus_generator"], id="import"),
+        pytest.param(["-m", "bus_generator.bus_generator", "--version"], id="version"),
+        pytest.param(["-m", "bus_generator.bus_generator", "--help"], id="help"),
+        pytest.param(["-m", "bus_generator.bus_generator", GPIO_RDL], id="usage-error"),
+    ],
+)
+def test_startup_does_not_import_heavy_dependencies(args):
+    imported = _imported_modules(*args)
+
+    assert "bus_generator" in imported
+    assert [name for name in HEAVY_MODULES if name in imported] == []
+
+
+def test_model_names_resolve_from_bus_generator():
+    model = bus_generator.model
+    public = {
+        name
+        for name, value in vars(model).items()
+        if not name.startswith("_")
+        and getattr(value, "__module__", model.__name__) == model.__name__
+        and (name.isupper() or callable(value))
+    }
+
+    assert set(model.__all__) == public
+    for name in model.__all__:
+        assert getattr(bus_generator_module, name) is getattr(model, name)
+    with pytest.raises(AttributeError):
+        bus_generator_module.missing_name
+
+
+# ---------------------------------------------------------------------------
+# Batch generation (--design)
+# ---------------------------------------------------------------------------
+
+
+def test_parse_arguments_designs():
+    args = parse_arguments(
+        ["--design", "a.rdl:out_a", "--design", "b.rdl,c.rdl:out_bc"]
+    )
+    assert args.input == []
+    assert args.designs == [(("a.rdl",), "out_a"), (("b.rdl", "c.rdl"), "out_bc")]
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        pytest.param(["--design", "a.rdl"], id="missing-output"),
+        pytest.param(["--design", ":out"], id="missing-input"),
+        pytest.param(["a.rdl", "--design", "b.rdl:out"], id="with-input"),
+        pytest.param(["-o", "out", "--design", "b.rdl:out"], id="with-output"),
+        pytest.param([], id="nothing"),
+    ],
+)
+def test_parse_arguments_invalid_designs(argv):
+    with pytest.raises(SystemExit) as e:
+        parse_arguments(argv)
+    assert e.value.code == 2
+
+
+def test_cli_batch_reports_each_design_and_continues(tmp_path, capsys):
+    with pytest.raises(SystemExit) as e:
+        main(
+            [
+                "-t",
+                "axi4l",
+                "c_header",
+                "--design",
+                f"{OVERSIZED_FIELD_RDL}:{tmp_path / 'oversized'}",
+                "--design",
+                f"{GPIO_RDL}:{tmp_path / 'gpio'}",
+                "--design",
+                f"./does_not_exist.rdl:{tmp_path / 'missing'}",
+                "--design",
+                f"{RAM_RDL}:{tmp_path / 'ram'}",
+            ]
+        )
+
+    assert e.value.code == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines] == [
+        "FAILED",
+        "ok",
+        "FAILED",
+        "ok",
+        "2",
+    ]
+    assert lines[-1] == "2 of 4 design(s) failed"
+    assert (tmp_path / "gpio" / "gpio_regs.v").is_file()
+    assert (tmp_path / "gpio" / "gpio.h").is_file()
+    assert (tmp_path / "ram" / "ram_regs.v").is_file()
+    assert not (tmp_path / "oversized").exists()
+
+
+def test_cli_batch_reads_designs_from_argument_file(tmp_path, capsys):
+    manifest = tmp_path / "designs.txt"
+    manifest.write_text(
+        f"--design={GPIO_RDL}:{tmp_path / 'gpio'}\n"
+        f"--design={SIMPLE_RDL}:{tmp_path / 'simple'}\n"
+    )
+
+    main([f"@{manifest}"])
+
+    assert capsys.readouterr().out.count("ok ") == 2
+    assert (tmp_path / "gpio" / "gpio_regs.v").read_text() == convert(
+        _compile(GPIO_RDL), "{{axi4l}}_regs.v.jinja2"
+    )
+    assert (tmp_path / "simple" / "simple_regs.v").is_file()
+
+
+def _run_batch(tmp_path, jobs):
+    designs = [
+        SIDE_EFFECTS_RDL,
+        GPIO_RDL,
+        OVERSIZED_FIELD_RDL,
+        RAM_RDL,
+        SIMPLE_RDL,
+        MEM_ACCESS_RDL,
+    ]
+    command = [sys.executable, "-m", "bus_generator.bus_generator", "-p"]
+    command += ["-j", str(jobs), "-t", "axi4l", "c_header"]
+    for rdl_path in designs:
+        command += ["--design", f"{rdl_path}:{tmp_path / 'out'}"]
+    return subprocess.run(command, capture_output=True, text=True, check=False)
+
+
+def test_cli_parallel_batch_matches_serial_batch(tmp_path):
+    serial = _run_batch(tmp_path / "jobs_1", jobs=1)
+    parallel = _run_batch(tmp_path / "jobs_3", jobs=3)
+
+    assert serial.returncode == parallel.returncode == 1
+    assert parallel.stdout.replace("jobs_3", "jobs_1") == serial.stdout
+    assert parallel.stderr.replace("jobs_3", "jobs_1") == serial.stderr
+    assert "Ignoring unsupported SystemRDL side-effect semantics" in serial.stderr
+
+    serial_files = sorted((tmp_path / "jobs_1" / "out").glob("*[.][vh]"))
+    parallel_files = sorted((tmp_path / "jobs_3" / "out").glob("*[.][vh]"))
+    assert [path.name for path in parallel_files] == [
+        path.name for path in serial_files
+    ]
+    assert len(serial_files) == 10
+    for serial_file, parallel_file in zip(serial_files, parallel_files):
+        assert parallel_file.read_bytes() == serial_file.read_bytes()
+
+
+def test_parse_arguments_rejects_negative_jobs():
+    with pytest.raises(SystemExit):
+        parse_arguments(["--design", "a.rdl:out", "-j", "-1"])
+    with pytest.raises(SystemExit):
+        parse_arguments(["a.rdl", "-o", "out", "--render-jobs", "-1"])
+
+
+def _render_design(output_dir, jobs, *args):
+    command = [sys.executable, "-m", "bus_generator.bus_generator", SELECT_RDL]
+    command += ["-o", str(output_dir), "-v", "--force", "--profile"]
+    command += ["--render-jobs", str(jobs), *args]
+    command += ["-t", "axi4l", "tb_axi4l", "c_header"]
+    command += ["--select", "select.left", "--select", "select.sub.inner"]
+    return subprocess.run(command, capture_output=True, text=True, check=False)
+
+
+def test_cli_parallel_render_matches_serial_render(tmp_path):
+    # The second runs regenerate existing, unchanged outputs
+    _render_design(tmp_path / "jobs_1", jobs=1)
+    _render_design(tmp_path / "jobs_3", jobs=3)
+    serial = _render_design(tmp_path / "jobs_1", jobs=1)
+    parallel = _render_design(tmp_path / "jobs_3", jobs=3)
+
+    assert serial.returncode == parallel.returncode == 0
+    # The templates are rendered in workers, from the pickled register maps
+    assert re.search(r"^ir +4 ", parallel.stderr, re.MULTILINE)
+    assert not re.search(r"^ir ", serial.stderr, re.MULTILINE)
+    assert re.search(r"^render +6 ", parallel.stderr, re.MULTILINE)
+
+    # Messages about each output are replayed in serial order; which worker
+    # creates the output folder is not deterministic
+    def messages(result, output_dir):
+        lines = result.stderr.replace(str(output_dir), "OUT").splitlines()
+        return [line for line in lines if 'File "OUT/' in line]
+
+    serial_messages = messages(serial, tmp_path / "jobs_1")
+    assert messages(parallel, tmp_path / "jobs_3") == serial_messages
+    assert len(serial_messages) == 6
+    serial_files = sorted((tmp_path / "jobs_1").glob("*[.][vh]"))
+    parallel_files = sorted((tmp_path / "jobs_3").glob("*[.][vh]"))
+    assert [path.name for path in parallel_files] == [
+        path.name for path in serial_files
+    ]
+    assert len(serial_files) == 6
+    for serial_file, parallel_file in zip(serial_files, parallel_files):
+        assert parallel_file.read_bytes() == serial_file.read_bytes()
+
+
+def test_cli_parallel_render_reports_output_path_errors(tmp_path):
+    (tmp_path / "gpio.h").mkdir()
+    with pytest.raises(SystemExit) as excinfo:
+        main(
+            [GPIO_RDL, "-o", str(tmp_path), "-t", "axi4l", "c_header", "--render-jobs", "2"]
+        )
+    assert excinfo.value.code == 2
+
+
+def test_cli_jobs_only_spread_designs(tmp_path):
+    # -j spreads --design designs over workers, it never renders in parallel
+    result = _render_design(tmp_path / "single", 1, "-j", "3")
+    assert result.returncode == 0
+    assert not re.search(r"^ir ", result.stderr, re.MULTILINE)
+
+    # --render-jobs also applies to each --design design
+    command = [sys.executable, "-m", "bus_generator.bus_generator", "--profile"]
+    command += ["-t", "axi4l", "c_header", "--render-jobs", "2"]
+    command += ["--design", f"{GPIO_RDL}:{tmp_path / 'gpio'}"]
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+    assert result.returncode == 0
+    assert re.search(r"^ir ", result.stderr, re.MULTILINE)
+
+
 # ---------------------------------------------------------------------------
 # Listeners on gpio.rdl
 # ---------------------------------------------------------------------------
@@ -201,31 +485,31 @@ def gpio_top():
 
 def test_gpio_fields(gpio_top):
     fields = _gather(gpio_top, FieldsGatheringListener).fields
-    assert [f["name"] for f in fields] == ["data_data", "direction_direction"]
-    by_name = {f["name"]: f for f in fields}
+    assert [f.name for f in fields] == ["data_data", "direction_direction"]
+    by_name = {f.name: f for f in fields}
 
     data = by_name["data_data"]
-    assert data["address"] == 0x0
-    assert data["low"] == 0 and data["high"] == 31
-    assert data["mask"] == 0xFFFFFFFF
-    assert data["is_sw_writable"] and data["is_sw_readable"]
-    assert data["is_hw_writable"] and data["is_hw_readable"]
+    assert data.address == 0x0
+    assert data.low == 0 and data.high == 31
+    assert data.mask == 0xFFFFFFFF
+    assert data.is_sw_writable and data.is_sw_readable
+    assert data.is_hw_writable and data.is_hw_readable
 
     direction = by_name["direction_direction"]
-    assert direction["address"] == 0x4
-    assert direction["is_sw_writable"] and direction["is_sw_readable"]
-    assert not direction["is_hw_writable"] and direction["is_hw_readable"]
+    assert direction.address == 0x4
+    assert direction.is_sw_writable and direction.is_sw_readable
+    assert not direction.is_hw_writable and direction.is_hw_readable
 
 
 def test_gpio_regs(gpio_top):
     regs = _gather(gpio_top, RegistersGatheringListener).regs
     assert len(regs) == 2
-    assert [r["address"] for r in regs] == [0x0, 0x4]
+    assert [r.address for r in regs] == [0x0, 0x4]
 
 
 def test_gpio_no_mems(gpio_top):
     mems = _gather(gpio_top, MemGatheringListener).mems
-    assert mems == []
+    assert len(mems) == 0
 
 
 # ---------------------------------------------------------------------------
@@ -235,15 +519,15 @@ def test_gpio_no_mems(gpio_top):
 
 def test_field_access_permissions():
     fields = _gather(_compile(FIELD_ACCESS_RDL), FieldsGatheringListener).fields
-    by_name = {f["name"]: f for f in fields}
+    by_name = {f.name: f for f in fields}
 
-    assert by_name["r_only_r_only"]["sw"] == "r"
-    assert by_name["r_only_r_only"]["is_sw_readable"]
-    assert not by_name["r_only_r_only"]["is_sw_writable"]
+    assert by_name["r_only_r_only"].sw == "r"
+    assert by_name["r_only_r_only"].is_sw_readable
+    assert not by_name["r_only_r_only"].is_sw_writable
 
-    assert by_name["w_only_w_only"]["sw"] == "w"
-    assert not by_name["w_only_w_only"]["is_sw_readable"]
-    assert by_name["w_only_w_only"]["is_sw_writable"]
+    assert by_name["w_only_w_only"].sw == "w"
+    assert not by_name["w_only_w_only"].is_sw_readable
+    assert by_name["w_only_w_only"].is_sw_writable
 
 
 # ---------------------------------------------------------------------------
@@ -322,38 +606,38 @@ def ram_top():
 
 def test_ram_fields(ram_top):
     fields = _gather(ram_top, FieldsGatheringListener).fields
-    assert [f["name"] for f in fields] == ["reg0_field0", "reg1_field0"]
-    by_name = {f["name"]: f for f in fields}
+    assert [f.name for f in fields] == ["reg0_field0", "reg1_field0"]
+    by_name = {f.name: f for f in fields}
 
     reg0 = by_name["reg0_field0"]
-    assert reg0["address"] == 0x0
-    assert reg0["is_sw_writable"] and reg0["is_sw_readable"]
+    assert reg0.address == 0x0
+    assert reg0.is_sw_writable and reg0.is_sw_readable
 
     reg1 = by_name["reg1_field0"]
-    assert reg1["address"] == 0x4
-    assert not reg1["is_sw_writable"] and reg1["is_sw_readable"]
-    assert reg1["is_hw_writable"]
+    assert reg1.address == 0x4
+    assert not reg1.is_sw_writable and reg1.is_sw_readable
+    assert reg1.is_hw_writable
 
 
 def test_ram_regs(ram_top):
     regs = _gather(ram_top, RegistersGatheringListener).regs
     assert len(regs) == 2
-    assert [r["address"] for r in regs] == [0x0, 0x4]
+    assert [r.address for r in regs] == [0x0, 0x4]
 
 
 def test_ram_mems(ram_top):
     mems = _gather(ram_top, MemGatheringListener).mems
     assert len(mems) == 2
-    assert {m["name"] for m in mems} == {"ram0", "ram1"}
+    assert {m.name for m in mems} == {"ram0", "ram1"}
     for mem in mems:
-        assert mem["mementries"] == 14
-        assert mem["size"] == 56
-        assert mem["width"] == 32
-        assert mem["is_sw_writable"] and mem["is_sw_readable"]
+        assert mem.mementries == 14
+        assert mem.size == 56
+        assert mem.width == 32
+        assert mem.is_sw_writable and mem.is_sw_readable
         # data_width=32 -> 4 bytes -> LSB at bit ceil(log2(4)) = 2
-        assert mem["addr_lsb"] == 2
-        assert mem["addr_width"] == mem["addr_msb"] - mem["addr_lsb"] + 1
-    assert {m["address"] for m in mems} == {0x100, 0x140}
+        assert mem.addr_lsb == 2
+        assert mem.addr_width == mem.addr_msb - mem.addr_lsb + 1
+    assert {m.address for m in mems} == {0x100, 0x140}
 
 
 # ---------------------------------------------------------------------------
@@ -363,23 +647,23 @@ def test_ram_mems(ram_top):
 
 def test_memory_access_permissions():
     mems = _gather(_compile(MEM_ACCESS_RDL), MemGatheringListener).mems
-    by_name = {m["name"]: m for m in mems}
+    by_name = {m.name: m for m in mems}
 
-    assert by_name["mem_r"]["sw"] == "r"
-    assert by_name["mem_r"]["is_sw_readable"]
-    assert not by_name["mem_r"]["is_sw_writable"]
+    assert by_name["mem_r"].sw == "r"
+    assert by_name["mem_r"].is_sw_readable
+    assert not by_name["mem_r"].is_sw_writable
 
-    assert by_name["mem_w"]["sw"] == "w"
-    assert not by_name["mem_w"]["is_sw_readable"]
-    assert by_name["mem_w"]["is_sw_writable"]
+    assert by_name["mem_w"].sw == "w"
+    assert not by_name["mem_w"].is_sw_readable
+    assert by_name["mem_w"].is_sw_writable
 
-    assert by_name["mem_rw"]["sw"] == "rw"
-    assert by_name["mem_rw"]["is_sw_readable"]
-    assert by_name["mem_rw"]["is_sw_writable"]
+    assert by_name["mem_rw"].sw == "rw"
+    assert by_name["mem_rw"].is_sw_readable
+    assert by_name["mem_rw"].is_sw_writable
 
-    assert by_name["mem_na"]["sw"] == "na"
-    assert not by_name["mem_na"]["is_sw_readable"]
-    assert not by_name["mem_na"]["is_sw_writable"]
+    assert by_name["mem_na"].sw == "na"
+    assert not by_name["mem_na"].is_sw_readable
+    assert not by_name["mem_na"].is_sw_writable
 
 
 # ---------------------------------------------------------------------------
@@ -395,25 +679,161 @@ def simple_top():
 def test_simple_fields(simple_top):
     fields = _gather(simple_top, FieldsGatheringListener).fields
     assert len(fields) == 16
-    assert [f["name"] for f in fields] == [f"reg{i}_field0" for i in range(16)]
-    assert [f["address"] for f in fields] == [i * 4 for i in range(16)]
+    assert [f.name for f in fields] == [f"reg{i}_field0" for i in range(16)]
+    assert [f.address for f in fields] == [i * 4 for i in range(16)]
     for field in fields:
-        assert field["low"] == 0 and field["high"] == 31
-        assert field["mask"] == 0xFFFFFFFF
-        assert field["is_sw_writable"] and field["is_sw_readable"]
-        assert not field["is_hw_writable"] and field["is_hw_readable"]
+        assert field.low == 0 and field.high == 31
+        assert field.mask == 0xFFFFFFFF
+        assert field.is_sw_writable and field.is_sw_readable
+        assert not field.is_hw_writable and field.is_hw_readable
 
 
 def test_simple_regs(simple_top):
     regs = _gather(simple_top, RegistersGatheringListener).regs
     assert len(regs) == 16
-    assert [r["name"] for r in regs] == [f"reg{i}" for i in range(16)]
-    assert [r["address"] for r in regs] == [i * 4 for i in range(16)]
+    assert [r.name for r in regs] == [f"reg{i}" for i in range(16)]
+    assert [r.address for r in regs] == [i * 4 for i in range(16)]
 
 
 def test_simple_no_mems(simple_top):
     mems = _gather(simple_top, MemGatheringListener).mems
-    assert mems == []
+    assert len(mems) == 0
+
+
+# ---------------------------------------------------------------------------
+# extract_model() single-walk gathering
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "rdl_path",
+    [
+        pytest.param(GPIO_RDL, id="gpio"),
+        pytest.param(RAM_RDL, id="ram"),
+        pytest.param(SIMPLE_RDL, id="simple"),
+    ],
+)
+def test_extract_model_matches_separate_listeners(rdl_path):
+    top = _compile(rdl_path)
+    model = extract_model(top)
+
+    assert model.fields == _gather(top, FieldsGatheringListener).fields
+    assert model.regs == _gather(top, RegistersGatheringListener).regs
+    assert model.mems == _gather(top, MemGatheringListener).mems
+    assert model.errors == []
+
+
+def test_extract_model_collects_side_effect_warnings(caplog):
+    top = _compile(SIDE_EFFECTS_RDL)
+
+    with caplog.at_level("WARNING"):
+        warn_unsupported_side_effects(top)
+        expected = [record.getMessage() for record in caplog.records]
+        caplog.clear()
+        model = extract_model(top)
+
+    assert model.warnings == expected
+    assert caplog.records == []
+
+
+def test_extract_model_rejects_oversized_field():
+    # Look the class up at call time; another test reloads the module.
+    with pytest.raises(
+        bus_generator_module.UnsupportedDataWidthError,
+        match="exceeds the fixed 32-bit",
+    ):
+        extract_model(_compile(OVERSIZED_FIELD_RDL))
+
+
+def test_cli_walks_design_once(monkeypatch, tmp_path):
+    walks = []
+
+    class CountingWalker(RDLWalker):
+        def walk(self, *args, **kwargs):
+            walks.append(args[0])
+            return super().walk(*args, **kwargs)
+
+    monkeypatch.setattr(bus_generator.model, "RDLWalker", CountingWalker)
+    main([GPIO_RDL, "-o", str(tmp_path), "-t", "axi4l", "c_header"])
+
+    assert len(walks) == 1
+    assert (tmp_path / "gpio_regs.v").is_file()
+    assert (tmp_path / "gpio.h").is_file()
+
+
+def test_field_table_rows_are_read_only_views():
+    model = extract_model(_compile(SIMPLE_RDL))
+    field = model.fields[0]
+
+    assert not hasattr(field, "__dict__")
+    with pytest.raises(AttributeError):
+        field.reset = 1
+    assert model.fields[1].wstrb_cases is field.wstrb_cases
+    assert model.fields[-1].name == "reg15_field0"
+    assert [row.name for row in model.fields[1:3]] == ["reg1_field0", "reg2_field0"]
+    with pytest.raises(IndexError):
+        model.fields[16]
+    assert [(case.be, case.mask) for case in field.wstrb_cases] == [
+        (0x1, 0x000000FF),
+        (0x2, 0x0000FF00),
+        (0x4, 0x00FF0000),
+        (0x8, 0xFF000000),
+    ]
+
+
+def _container_bytes(objects):
+    """Return the memory held by ``objects`` and the dicts, lists, tuples and
+    records inside them, counting shared containers once. Leaf values such as
+    names and numbers are shared by both record shapes, so they are ignored."""
+    seen = set()
+    total = 0
+    pending = list(objects)
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, dict):
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            pending.extend(item)
+        elif dataclasses.is_dataclass(item):
+            pending.extend(getattr(item, name) for name in item.__slots__)
+        else:
+            continue
+        total += sys.getsizeof(item)
+    return total
+
+
+def test_field_table_memory_benchmark(tmp_path):
+    # Compare the field table of a 512-register map with the per-field dicts
+    # and the frozen slotted records it replaces. All three share the same
+    # names and numbers, so only the containers are compared.
+    fields = extract_model(_compile(str(_write_large_map(tmp_path, 512)))).fields
+    names = fields.row_names()
+    Record = dataclasses.make_dataclass("Record", names, frozen=True, slots=True)
+    records = [Record(*(getattr(row, name) for name in names)) for row in fields]
+    dicts = [
+        {name: getattr(row, name) for name in names}
+        | {
+            "wstrb_cases": [
+                {"be": case.be, "mask": case.mask} for case in row.wstrb_cases
+            ]
+        }
+        for row in fields
+    ]
+
+    columns = [*fields.COLUMNS, "flags", *fields.DERIVED]
+    table_bytes = sum(sys.getsizeof(getattr(fields, name)) for name in columns)
+    table_bytes += _container_bytes(fields.wstrb_cases)
+    per_field = {
+        "table": table_bytes / len(fields),
+        "records": _container_bytes([records]) / len(fields),
+        "dicts": _container_bytes([dicts]) / len(fields),
+    }
+
+    assert per_field["records"] * 4 < per_field["dicts"], per_field
+    assert per_field["table"] * 2 < per_field["records"], per_field
 
 
 # ---------------------------------------------------------------------------
@@ -433,3 +853,1149 @@ def test_convert_renders_module(rdl_path, top_name):
     content = convert(_compile(rdl_path), "{{axi4l}}_regs.v.jinja2")
     assert f"module {top_name}_regs (" in content
     assert "s_axi_awaddr" in content
+
+
+def test_render_shares_one_register_map_across_templates():
+    top = _compile(GPIO_RDL)
+    register_map = build_register_map(top)
+    template_names = [
+        "{{axi4l}}_regs.v.jinja2",
+        "{{c_header}}.h.jinja2",
+        "tb_{{axi4l}}_regs.v.jinja2",
+    ]
+
+    outputs = list(render(register_map, template_names))
+
+    assert [name for name, _ in outputs] == ["gpio_regs.v", "gpio.h", "tb_gpio_regs.v"]
+    for template_name, (_, content) in zip(template_names, outputs):
+        assert content == convert(top, template_name)
+
+
+def test_cli_creates_one_environment_for_all_templates(monkeypatch, tmp_path):
+    environments = []
+    create_environment = bus_generator_module.create_environment
+
+    def counting_create_environment(*args, **kwargs):
+        environments.append(create_environment(*args, **kwargs))
+        return environments[-1]
+
+    monkeypatch.setattr(
+        bus_generator_module, "create_environment", counting_create_environment
+    )
+    main([GPIO_RDL, "-o", str(tmp_path), "-t", "axi4l", "c_header", "tb_axi4l"])
+
+    assert len(environments) == 1
+    assert (tmp_path / "tb_gpio_regs.v").is_file()
+
+
+# ---------------------------------------------------------------------------
+# Template bytecode cache
+# ---------------------------------------------------------------------------
+
+
+def _count_compiles(monkeypatch, env):
+    compiles = []
+    compile_template = env.compile
+
+    def counting_compile(*args, **kwargs):
+        compiles.append(args)
+        return compile_template(*args, **kwargs)
+
+    monkeypatch.setattr(env, "compile", counting_compile)
+    return compiles
+
+
+def test_template_cache_skips_compilation_in_later_environments(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setenv("BUS_GENERATOR_CACHE_DIR", str(tmp_path))
+    register_map = build_register_map(_compile(GPIO_RDL))
+    template_names = ["{{axi4l}}_regs.v.jinja2"]
+
+    first = create_environment()
+    first_compiles = _count_compiles(monkeypatch, first)
+    expected = list(render(register_map, template_names, first))
+
+    second = create_environment()
+    second_compiles = _count_compiles(monkeypatch, second)
+    assert list(render(register_map, template_names, second)) == expected
+
+    assert len(first_compiles) == 1
+    assert second_compiles == []
+    assert list(tmp_path.rglob("*.cache"))
+
+
+def test_cli_no_cache_leaves_cache_dir_empty(monkeypatch, tmp_path):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("BUS_GENERATOR_CACHE_DIR", str(cache_dir))
+
+    main([GPIO_RDL, "-o", str(tmp_path / "out"), "--no-cache"])
+
+    assert (tmp_path / "out" / "gpio_regs.v").is_file()
+    assert not cache_dir.exists()
+
+
+# ---------------------------------------------------------------------------
+# Incremental generation (output manifest)
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def count_compiles(monkeypatch):
+    compiled = []
+    compile_file = RDLCompiler.compile_file
+
+    def counting_compile_file(self, path, *args, **kwargs):
+        compiled.append(path)
+        return compile_file(self, path, *args, **kwargs)
+
+    monkeypatch.setattr(RDLCompiler, "compile_file", counting_compile_file)
+    return compiled
+
+
+def _write_included_design(directory, reset):
+    (directory / "defs.rdl").write_text(
+        f"reg status_t {{ field {{ sw = rw; hw = r; }} value[31:0] = {reset}; }};\n"
+    )
+    (directory / "top.rdl").write_text(
+        '`include "defs.rdl"\naddrmap incl { status_t status @ 0x0; };\n'
+    )
+    return directory / "top.rdl"
+
+
+def test_cli_skips_compilation_when_manifest_is_current(tmp_path, count_compiles):
+    output_dir = tmp_path / "out"
+    argv = [GPIO_RDL, "-o", str(output_dir), "-t", "axi4l", "c_header"]
+
+    main(argv)
+    assert count_compiles == [GPIO_RDL]
+    assert (output_dir / "gpio_regs.v").is_file()
+    assert Path(manifest_path(str(output_dir), [GPIO_RDL])).is_file()
+
+    main(argv)
+    assert count_compiles == [GPIO_RDL]
+
+    main(argv + ["--force"])
+    assert count_compiles == [GPIO_RDL, GPIO_RDL]
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        pytest.param("include", id="included-file-changed"),
+        pytest.param("output", id="output-deleted"),
+        pytest.param("templates", id="templates-changed"),
+    ],
+)
+def test_cli_regenerates_when_manifest_is_stale(tmp_path, count_compiles, change):
+    top_rdl = _write_included_design(tmp_path, reset=0)
+    output_dir = tmp_path / "out"
+    argv = [str(top_rdl), "-o", str(output_dir)]
+    main(argv)
+    assert "'h0;" in (output_dir / "incl_regs.v").read_text()
+
+    if change == "include":
+        _write_included_design(tmp_path, reset="0x5a")
+    elif change == "output":
+        (output_dir / "incl_regs.v").unlink()
+    else:
+        argv += ["-t", "axi4l", "c_header"]
+    main(argv)
+
+    assert count_compiles == [str(top_rdl), str(top_rdl)]
+    if change == "include":
+        assert "'h5a;" in (output_dir / "incl_regs.v").read_text()
+    assert (output_dir / "incl_regs.v").is_file()
+
+
+# ---------------------------------------------------------------------------
+# Watch mode (--watch)
+# ---------------------------------------------------------------------------
+
+
+def _watch(monkeypatch, argv, edits):
+    """Run ``--watch`` with ``argv``, applying one of ``edits`` at each poll and
+    interrupting the watch once they are exhausted."""
+    edits = iter(edits)
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        edit = next(edits, None)
+        if edit is None:
+            raise KeyboardInterrupt
+        edit()
+
+    monkeypatch.setattr(bus_generator_module.time, "sleep", sleep)
+    main(argv + ["--watch", "--interval", "0.25"])
+    return sleeps
+
+
+def _touch(path, content):
+    """Write ``path`` and move its modification time forward, as coarse file
+    system timestamps could otherwise hide the change."""
+    mtime = path.stat().st_mtime_ns
+    path.write_text(content)
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+
+
+def test_cli_watch_regenerates_when_an_include_changes(
+    monkeypatch, capsys, tmp_path, count_compiles
+):
+    top_rdl = _write_included_design(tmp_path, reset=0)
+    output_dir = tmp_path / "out"
+    defs = tmp_path / "defs.rdl"
+    new_defs = defs.read_text().replace("= 0;", "= 0x5a;")
+
+    sleeps = _watch(
+        monkeypatch,
+        [str(top_rdl), "-o", str(output_dir)],
+        [lambda: None, lambda: _touch(defs, new_defs)],
+    )
+
+    assert sleeps == [0.25, 0.25, 0.25]
+    assert count_compiles == [str(top_rdl), str(top_rdl)]
+    assert "'h5a;" in (output_dir / "incl_regs.v").read_text()
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2
+    for line in lines:
+        assert re.fullmatch(rf"ok     {re.escape(str(top_rdl))} -> .* in \d+ ms", line)
+
+
+def test_cli_watch_keeps_watching_after_an_error(
+    monkeypatch, capsys, tmp_path, count_compiles
+):
+    top_rdl = tmp_path / "top.rdl"
+    top_rdl.write_text("addrmap broken {")
+    output_dir = tmp_path / "out"
+
+    _watch(
+        monkeypatch,
+        [str(top_rdl), "-o", str(output_dir), "-q"],
+        [lambda: _touch(top_rdl, Path(GPIO_RDL).read_text())],
+    )
+
+    assert len(count_compiles) == 2
+    assert (output_dir / "gpio_regs.v").is_file()
+    out = capsys.readouterr().out
+    assert out.startswith("FAILED ")
+    assert "\nok     " in out
+
+
+def test_parse_arguments_rejects_non_positive_interval(capsys):
+    with pytest.raises(SystemExit):
+        parse_arguments([GPIO_RDL, "-o", "out", "--watch", "--interval", "0"])
+
+    assert "--interval must be positive" in capsys.readouterr().err
+
+
+# ---------------------------------------------------------------------------
+# write_file() write-if-changed
+# ---------------------------------------------------------------------------
+
+
+def test_write_file_keeps_identical_output_untouched(tmp_path):
+    target = tmp_path / "out.v"
+    assert write_file(tmp_path, "module m;\nendmodule\n", "out.v")
+    os.utime(target, (1_000_000, 1_000_000))
+
+    assert not write_file(tmp_path, "module m;\nendmodule\n", "out.v")
+
+    assert target.stat().st_mtime == 1_000_000
+    assert target.read_bytes() == b"module m;\nendmodule\n"
+
+
+def test_write_file_replaces_changed_output(tmp_path):
+    target = tmp_path / "out.v"
+    write_file(tmp_path, "old\n", "out.v")
+    os.utime(target, (1_000_000, 1_000_000))
+
+    assert write_file(tmp_path, "new\n", "out.v")
+
+    assert target.stat().st_mtime != 1_000_000
+    assert target.read_bytes() == b"new\n"
+    assert [path.name for path in tmp_path.iterdir()] == ["out.v"]
+    umask = os.umask(0)
+    os.umask(umask)
+    assert target.stat().st_mode & 0o777 == 0o666 & ~umask
+
+
+def test_write_file_rejects_non_file_target(tmp_path):
+    (tmp_path / "out.v").mkdir()
+
+    with pytest.raises(OSError, match="not a regular file"):
+        write_file(tmp_path, "content\n", "out.v")
+
+
+def test_write_file_streams_chunks(tmp_path):
+    target = tmp_path / "out.v"
+    assert write_file(tmp_path, iter(["module m;\n", "endmodule\n"]), "out.v")
+    os.utime(target, (1_000_000, 1_000_000))
+
+    assert not write_file(tmp_path, iter(["module m;\n", "endmodule\n"]), "out.v")
+    assert target.stat().st_mtime == 1_000_000
+    assert [path.name for path in tmp_path.iterdir()] == ["out.v"]
+
+    assert write_file(tmp_path, iter(["module m;\n", "endmodule // m\n"]), "out.v")
+    assert target.read_bytes() == b"module m;\nendmodule // m\n"
+    assert [path.name for path in tmp_path.iterdir()] == ["out.v"]
+
+
+def test_streamed_render_matches_render():
+    register_map = build_register_map(_compile(GPIO_RDL))
+    template_names = [stem + ".jinja2" for stem in discover_templates().values()]
+
+    rendered = list(render(register_map, template_names))
+    streamed = [
+        (name, "".join(chunks))
+        for name, chunks in render(register_map, template_names, stream=True)
+    ]
+
+    assert streamed == rendered
+
+
+def _write_large_map(directory, registers):
+    """Write an RDL map of ``registers`` 32-bit registers and return its path."""
+    reg = "reg { field { sw = rw; hw = r; } f[31:0] = 0; }"
+    rdl = directory / f"regs{registers}.rdl"
+    rdl.write_text(
+        "addrmap big {\n"
+        + "".join(f"  {reg} r{i} @ {4 * i:#x};\n" for i in range(registers))
+        + "};\n"
+    )
+    return rdl
+
+
+def _streamed_write_peak(directory, registers):
+    """Return the output size and the peak memory traced while streaming the
+    axi4l output of a map of ``registers`` registers to a file."""
+    rdl = _write_large_map(directory, registers)
+    register_map = build_register_map(_compile(str(rdl)))
+    env = create_environment()
+    env.get_template("{{axi4l}}_regs.v.jinja2")
+
+    tracemalloc.start()
+    try:
+        for name, chunks in render(
+            register_map, ["{{axi4l}}_regs.v.jinja2"], env, stream=True
+        ):
+            write_file(directory, chunks, name)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return (directory / name).stat().st_size, peak
+
+
+def test_streamed_write_memory_does_not_grow_with_output_size(tmp_path):
+    (tmp_path / "small").mkdir()
+    (tmp_path / "large").mkdir()
+    _, small_peak = _streamed_write_peak(tmp_path / "small", 100)
+    large_size, large_peak = _streamed_write_peak(tmp_path / "large", 400)
+
+    assert large_peak < 2 * small_peak
+    assert large_peak < large_size / 4
+
+
+def test_cli_forced_regeneration_keeps_unchanged_outputs(tmp_path):
+    main([GPIO_RDL, "-o", str(tmp_path), "-t", "axi4l", "c_header"])
+    for path in tmp_path.glob("gpio*"):
+        os.utime(path, (1_000_000, 1_000_000))
+
+    main([GPIO_RDL, "-o", str(tmp_path), "-t", "axi4l", "c_header", "--force"])
+
+    assert [path.stat().st_mtime for path in tmp_path.glob("gpio*")] == [
+        1_000_000,
+        1_000_000,
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Register model cache (--model-cache)
+# ---------------------------------------------------------------------------
+
+
+def test_cli_model_cache_skips_compilation_until_an_include_changes(
+    tmp_path, count_compiles
+):
+    top_rdl = _write_included_design(tmp_path, reset=0)
+    argv = [str(top_rdl), "-o", str(tmp_path / "out"), "--model-cache", "--force"]
+
+    main(argv)
+    main(argv + ["-t", "c_header"])
+    assert count_compiles == [str(top_rdl)]
+    assert (tmp_path / "out" / "incl.h").is_file()
+
+    _write_included_design(tmp_path, reset="0x5a")
+    main(argv)
+    assert count_compiles == [str(top_rdl), str(top_rdl)]
+    assert "'h5a;" in (tmp_path / "out" / "incl_regs.v").read_text()
+
+
+def test_cli_model_cache_replays_warnings(tmp_path, caplog, count_compiles):
+    argv = [SIDE_EFFECTS_RDL, "-o", str(tmp_path), "--model-cache", "--force"]
+    main(argv)
+    caplog.clear()
+
+    with caplog.at_level("WARNING"):
+        main(argv)
+
+    assert count_compiles == [SIDE_EFFECTS_RDL]
+    assert len(caplog.records) == 5
+
+
+def test_cli_no_cache_disables_model_cache(tmp_path, count_compiles):
+    argv = [GPIO_RDL, "-o", str(tmp_path), "--model-cache", "--no-cache", "--force"]
+    main(argv)
+    main(argv)
+
+    assert count_compiles == [GPIO_RDL, GPIO_RDL]
+
+
+# ---------------------------------------------------------------------------
+# Phase profiling (--profile)
+# ---------------------------------------------------------------------------
+
+
+def test_profile_charges_nested_phases_once(monkeypatch):
+    clock = iter(range(0, 100, 1))
+    monkeypatch.setattr(profiling.time, "perf_counter", lambda: next(clock))
+    monkeypatch.setattr(profiling.time, "process_time", lambda: 0.0)
+    profile = profiling.enable()
+    try:
+        # Each clock read advances one second: write runs from 1 to 8 and the
+        # three batches of render, the last one empty, take one second each
+        with profiling.phase("write"):
+            text = list(profiling.timed_text(["a", "b", "c"], "render", batch=2))
+        profiling.count("fields", 3)
+        profiling.count("fields", 4)
+    finally:
+        profiling.disable()
+
+    assert {name: entry[:2] for name, entry in profile.phases.items()} == {
+        "render": [1, 3],
+        "write": [1, 4],
+    }
+    assert text == ["ab", "c"]
+    assert profile.counts == {"fields": 7}
+    with profiling.phase("write"):
+        pass
+    assert profile.phases["write"][0] == 1
+
+
+def test_cli_profile_reports_phases_and_dumps_stats(tmp_path, capsys):
+    stats = tmp_path / "run.pstats"
+    argv = [GPIO_RDL, "-o", str(tmp_path), "-t", "axi4l", "c_header"]
+    main(argv + ["--profile", "--profile-output", str(stats)])
+
+    err = capsys.readouterr().err
+    phases = [line.split()[0] for line in err.splitlines()[1:-2]]
+    assert phases == [
+        "environment",
+        "import",
+        "manifest",
+        "compile",
+        "elaborate",
+        "walk",
+        "template",
+        "render",
+        "write",
+        "(other)",
+    ]
+    assert "designs 1, nodes 5, fields 2, registers 2, memories 0, output" in err
+    assert err.endswith(", outputs 2\n")
+    assert profiling.active() is None
+    assert pstats.Stats(str(stats)).total_calls > 0
+
+
+def test_cli_profile_merges_worker_phases(tmp_path, capsys):
+    designs = [f"{GPIO_RDL}:{tmp_path / 'gpio'}", f"{RAM_RDL}:{tmp_path / 'ram'}"]
+    main(["--design", designs[0], "--design", designs[1], "-j", "2", "--profile"])
+
+    err = capsys.readouterr().err
+    assert re.search(r"^compile +2 ", err, re.MULTILINE)
+    assert "designs 2, nodes 12, fields 4, registers 4, memories 2" in err
+
+
+# ---------------------------------------------------------------------------
+# Rolled register arrays (--rolled-arrays)
+# ---------------------------------------------------------------------------
+
+
+def _unrolled_elements(field):
+    """Return ``(address, lsb)`` of each element of a rolled field, in index
+    order."""
+    if field.array is None:
+        return [(field.address, field.lsb)]
+    strides = field.array.strides
+    return [
+        (field.address + sum(map(operator.mul, index, strides)), field.lsb)
+        for index in itertools.product(*map(range, field.array.dims))
+    ]
+
+
+def test_rolled_model_expands_to_unrolled_model():
+    top = _compile(ARRAYS_RDL)
+    rolled = extract_model(top, rolled=True)
+    unrolled = extract_model(top)
+
+    assert len(rolled.fields) == 14
+    assert len(unrolled.fields) == 53
+    expanded = [
+        (address, lsb, field.msb, field.reset, field.sw)
+        for field in rolled.fields
+        for address, lsb in _unrolled_elements(field)
+    ]
+    assert sorted(expanded) == sorted(
+        (f.address, f.lsb, f.msb, f.reset, f.sw) for f in unrolled.fields
+    )
+
+    lane = next(field for field in rolled.fields if field.name == "block_lane_mode")
+    assert lane.address == 0x104
+    assert lane.array.dims == (3, 2)
+    assert lane.array.strides == (12, 4)
+    assert lane.array.count == 6
+    assert lane.array.element_strides == (2, 1)
+    # Every field and register of one array shares its shape
+    lane_reg = next(reg for reg in rolled.regs if reg.name == "block_lane")
+    assert lane_reg.array is lane.array
+    assert rolled.regs[0].array is None
+
+
+def test_rolled_model_rejects_arrays_of_memories(tmp_path):
+    rdl = tmp_path / "mem_array.rdl"
+    rdl.write_text(
+        "addrmap mem_array {\n"
+        "  external mem { mementries = 16; memwidth = 32; } ram[2] @ 0x0 += 0x40;\n"
+        "};\n"
+    )
+    top = _compile(str(rdl))
+
+    assert len(extract_model(top).mems) == 2
+    with pytest.raises(
+        bus_generator.model.UnsupportedArrayError, match=r"mem_array\.ram\[\]"
+    ):
+        extract_model(top, rolled=True)
+
+
+def test_rolled_axi4l_emits_generate_loops():
+    register_map = build_register_map(_compile(ARRAYS_RDL), rolled=True)
+    ((_, content),) = render(register_map, ["{{axi4l}}_regs.v.jinja2"])
+
+    assert "output wire [15:0] chan_mode_out" in content
+    assert "genvar block_lane_mode_i0, block_lane_mode_i1;" in content
+    # The element address is sized to ADDR_WIDTH before the word bits are compared
+    assert (
+        "localparam [ADDR_WIDTH-1:0] ADDRESS = 'h40 + grid_i0 * 'hc + grid_i1 * 'h4;"
+    ) in content
+    assert (
+        "assign grid_strb[grid_i0 * 3 + grid_i1] = (int_addr[8:2] == ADDRESS[8:2]);"
+    ) in content
+    assert "assign chan_id_value = {4{4'ha}};" in content
+    assert "if (|chan_strb) begin" in content
+
+
+def test_axi4l_decodes_each_register_address_once():
+    content = convert(_compile(ARRAYS_RDL), "{{axi4l}}_regs.v.jinja2")
+
+    # The four fields of "single" share one comparator
+    assert content.count("int_addr[8:2] == 'h0)") == 1
+    assert "wire single_strb;" in content
+    assert "single_enable_strb" not in content
+    assert "end else if (int_wr_en && single_strb) begin" in content
+    decoders = [line for line in content.splitlines() if "_strb = (int_addr" in line]
+    assert len(decoders) == len(build_register_map(_compile(ARRAYS_RDL)).regs)
+
+
+def test_rolled_output_size_does_not_grow_with_array_size(tmp_path):
+    sizes = {}
+    for count in (4, 256):
+        rdl = tmp_path / f"array{count}.rdl"
+        rdl.write_text(
+            "addrmap big {\n"
+            "  reg { field { sw = rw; hw = r; } f[31:0] = 0; } regs[%d] @ 0x0;\n"
+            "};\n" % count
+        )
+        register_map = build_register_map(_compile(str(rdl)), rolled=True)
+        ((_, content),) = render(register_map, ["{{axi4l}}_regs.v.jinja2"])
+        sizes[count] = len(content)
+    unrolled = convert(_compile(str(rdl)), "{{axi4l}}_regs.v.jinja2")
+
+    assert sizes[256] - sizes[4] < 16
+    assert sizes[256] * 10 < len(unrolled)
+
+
+def test_rolled_c_header_emits_indexed_macros():
+    register_map = build_register_map(_compile(ARRAYS_RDL), rolled=True)
+    ((_, content),) = render(register_map, ["{{c_header}}.h.jinja2"])
+
+    assert "#define SINGLE_MODE_ADDR 0x0 /* 0 */\n" in content
+    assert (
+        "#define CHAN_MODE_ADDR(i) (0x10 + (i) * 0x8) /* 16 + (i) * 8 */\n"
+        "#define CHAN_MODE_COUNT 0x4 /* 4 */\n"
+    ) in content
+    assert (
+        "#define GRID_VALUE_ADDR(i0, i1) (0x40 + (i0) * 0xc + (i1) * 0x4)"
+        " /* 64 + (i0) * 12 + (i1) * 4 */\n"
+        "#define GRID_VALUE_COUNT0 0x2 /* 2 */\n"
+        "#define GRID_VALUE_COUNT1 0x3 /* 3 */\n"
+    ) in content
+
+
+def test_cli_rolled_arrays_generates_and_rejects_unsupported_templates(
+    tmp_path, capsys
+):
+    argv = [ARRAYS_RDL, "-o", str(tmp_path), "--rolled-arrays"]
+    main(argv + ["-t", "axi4l", "c_header"])
+    assert "gen_chan_mode_value" in (tmp_path / "arrays_regs.v").read_text()
+    assert "CHAN_MODE_ADDR(i)" in (tmp_path / "arrays.h").read_text()
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(argv + ["-t", "tb_axi4l"])
+    assert excinfo.value.code == 2
+    assert "does not support template(s): tb_axi4l" in capsys.readouterr().err
+
+    # Switching back to unrolled output regenerates despite the manifest
+    main([ARRAYS_RDL, "-o", str(tmp_path)])
+    assert "gen_chan_mode_value" not in (tmp_path / "arrays_regs.v").read_text()
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks (benchmarks/run.py)
+# ---------------------------------------------------------------------------
+
+BENCHMARK = "benchmarks/run.py"
+
+
+def _run_benchmark(*args):
+    return subprocess.run(
+        [sys.executable, BENCHMARK, *args], capture_output=True, text=True
+    )
+
+
+def test_synthetic_rdl_compiles_to_requested_size(tmp_path):
+    sys.path.insert(0, "benchmarks")
+    try:
+        from synthetic import synthetic_rdl
+    finally:
+        sys.path.remove("benchmarks")
+    rdl = tmp_path / "bench.rdl"
+    rdl.write_text(synthetic_rdl(25, fields=3, block_registers=10, array_size=4))
+
+    model = extract_model(_compile(str(rdl)))
+    assert len(model.regs) == 25
+    assert len(model.fields) == 75
+    assert len(model.mems) == 3
+
+
+def test_benchmark_records_and_compares_results(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    proc = _run_benchmark(
+        "--sizes", "10", "--templates", "c_header", "-o", str(baseline)
+    )
+    assert proc.returncode == 0, proc.stderr
+    results = json.loads(baseline.read_text())["results"]
+    result = results["c_header/10"]
+    assert result["registers"] == 10
+    assert result["counts"]["registers"] == 10
+    assert {"compile", "render", "write"} <= result["phases"].keys()
+    assert result["peak_rss"] > 0
+
+    proc = _run_benchmark("--results", str(baseline), "--compare", str(baseline))
+    assert proc.returncode == 0
+    assert proc.stdout == "no regressions\n"
+
+    # A baseline twice as fast and small makes every figure a regression
+    result["wall"] /= 2
+    result["peak_rss"] //= 2
+    faster = tmp_path / "faster.json"
+    faster.write_text(json.dumps({"results": results}))
+    proc = _run_benchmark(
+        "--results", str(baseline), "--compare", str(faster), "--min-time", "0"
+    )
+    assert proc.returncode == 1
+    regressions = proc.stdout.splitlines()
+    assert regressions[0].startswith("REGRESSION c_header/10 wall: ")
+    assert regressions[1].startswith("REGRESSION c_header/10 peak_rss: ")
+    assert len(regressions) == 2
+
+
+# ---------------------------------------------------------------------------
+# Hierarchy printing (--print)
+# ---------------------------------------------------------------------------
+
+
+def _print(path, **kwargs) -> str:
+    file = io.StringIO()
+    print_hierarchy(_compile(path), file=file, **kwargs)
+    return file.getvalue()
+
+
+def test_print_hierarchy_limits_depth():
+    assert _print(ARRAYS_RDL, max_depth=0) == (
+        "arrays @0x0(0x0) addrmap, size: 292\n"
+    )
+    lines = _print(ARRAYS_RDL, max_depth=1).splitlines()
+    assert lines[:3] == [
+        "arrays @0x0(0x0) addrmap, size: 292",
+        "\tsingle @0x0(0x0) reg",
+        "\tchan @0x10(0x10) reg",
+    ]
+    assert all(line.count("\t") <= 1 for line in lines)
+    assert len(lines) == 1 + 1 + 4 + 6 + 3
+
+
+def test_print_hierarchy_prunes_walk_to_filtered_subtrees(monkeypatch):
+    visited = []
+    enter = bus_generator.model.ModelPrintingListener.enter_Component
+
+    def counting_enter(self, node):
+        visited.append(node.inst_name)
+        return enter(self, node)
+
+    monkeypatch.setattr(
+        bus_generator.model.ModelPrintingListener, "enter_Component", counting_enter
+    )
+    output = _print(ARRAYS_RDL, patterns=["arrays.block_1.lane_*", "*.chan_3.id"])
+
+    assert output == (
+        "arrays @0x0(0x0) addrmap, size: 292\n"
+        "\tchan @0x28(0x28) reg\n"
+        "\t\tid [31:28] field, sw: r, hw: na\n"
+        "\tblock @0x10c(0x10c) regfile, size: 12\n"
+        "\t\tlane @0x110(0x4) reg\n"
+        "\t\t\tenable [0:0] field, sw: rw, hw: r\n"
+        "\t\t\tmode [11:8] field, sw: rw, hw: rw\n"
+        "\t\t\tstatus [23:16] field, sw: r, hw: w\n"
+        "\t\t\tid [31:28] field, sw: r, hw: na\n"
+        "\t\tlane @0x114(0x8) reg\n"
+        "\t\t\tenable [0:0] field, sw: rw, hw: r\n"
+        "\t\t\tmode [11:8] field, sw: rw, hw: rw\n"
+        "\t\t\tstatus [23:16] field, sw: r, hw: w\n"
+        "\t\t\tid [31:28] field, sw: r, hw: na\n"
+    )
+    # The top, its 1 + 4 + 6 + 3 children, the fields of chan_3 and the head
+    # and lanes of block_1 with the lane fields; nothing else is walked
+    assert len(visited) == 1 + 14 + 4 + 3 + 8
+
+
+def test_print_hierarchy_json_lines():
+    records = [
+        json.loads(line)
+        for line in _print(GPIO_RDL, json_lines=True).splitlines()
+    ]
+    assert records[0] == {
+        "path": "gpio",
+        "depth": 0,
+        "type": "addrmap",
+        "name": "gpio",
+        "address": 0,
+        "offset": 0,
+        "size": 8,
+    }
+    assert records[1]["path"] == "gpio.data"
+    assert records[2] == {
+        "path": "gpio.data.data",
+        "depth": 2,
+        "type": "field",
+        "name": "data",
+        "msb": records[2]["msb"],
+        "lsb": records[2]["lsb"],
+        "sw": records[2]["sw"],
+        "hw": records[2]["hw"],
+    }
+
+
+def test_cli_print_options_need_print(capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        parse_arguments([GPIO_RDL, "-o", "out", "--print-depth", "1"])
+    assert excinfo.value.code == 2
+    assert "need --print" in capsys.readouterr().err
+
+
+def test_cli_print_only_checks_the_printed_nodes(capsys, caplog):
+    with pytest.raises(SystemExit) as e:
+        main([OVERSIZED_FIELD_RDL, "-p", "--print-format", "jsonl"])
+    assert e.value.code == 1
+    # The hierarchy is printed before the error is reported
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert records[-1]["msb"] == 63
+    assert "exceeds the fixed 32-bit DATA_WIDTH" in caplog.text
+
+    with pytest.raises(SystemExit):
+        main([SELECT_RDL, "-p", "--rolled-arrays"])
+    assert "'select.dma[1].buffer' is in an array" in caplog.text
+
+    # Nodes outside the printed part are neither walked nor checked
+    main([OVERSIZED_FIELD_RDL, "-p", "--print-depth", "1"])
+    main([SELECT_RDL, "-p", "--rolled-arrays", "--print-filter", "select.left"])
+
+
+# ---------------------------------------------------------------------------
+# Selected addrmaps (--select)
+# ---------------------------------------------------------------------------
+
+SELECT_TEMPLATES = ["{{axi4l}}_regs.v.jinja2", "{{c_header}}.h.jinja2"]
+
+
+def _standalone_child(inst_name):
+    """Return ``child_map`` of SELECT_RDL elaborated as the top."""
+    rdlc = RDLCompiler()
+    rdlc.compile_file(SELECT_RDL)
+    return rdlc.elaborate(top_def_name="child_map", inst_name=inst_name).top
+
+
+@pytest.mark.parametrize("rolled", [False, True])
+@pytest.mark.parametrize(
+    "path, module",
+    [
+        ("select.left", "left"),
+        ("select.dma[1]", "dma_1"),
+        ("select.sub.inner", "inner"),
+    ],
+)
+def test_selected_addrmap_renders_like_a_standalone_design(path, module, rolled):
+    (selected,) = build_register_maps([_compile(SELECT_RDL)], [path], rolled)
+    standalone = build_register_map(_standalone_child(module), rolled)
+
+    assert selected.top_name == module
+    assert selected.addr_width == standalone.addr_width == 6
+    assert selected.mems.address[0] == 0x20
+    assert list(render(selected, SELECT_TEMPLATES)) == list(
+        render(standalone, SELECT_TEMPLATES)
+    )
+
+
+@pytest.mark.parametrize(
+    "path, message",
+    [
+        ("select.dma", "it is an array, select one element"),
+        ("select.left.ctrl", "it is not an addrmap"),
+        ("select.missing", "no such node"),
+        ("other.left", "no such node"),
+        ("select.dma[2]", "Array index out of range"),
+    ],
+)
+def test_select_addrmap_rejects_invalid_paths(path, message):
+    with pytest.raises(SelectionError) as excinfo:
+        select_addrmap(_compile(SELECT_RDL), path)
+    assert str(excinfo.value).startswith(f"Cannot select '{path}': ")
+    assert message in str(excinfo.value)
+
+
+def test_build_register_maps_rejects_duplicate_modules():
+    with pytest.raises(SelectionError, match="generate the same module 'inner'"):
+        build_register_maps(
+            [_compile(SELECT_RDL)], ["select.sub.inner", "select.sub.inner"]
+        )
+
+
+def test_cli_select_generates_each_addrmap_as_a_module(
+    tmp_path, monkeypatch, count_compiles
+):
+    walked = []
+    monkeypatch.setattr(
+        bus_generator.model.ModelGatheringListener,
+        "enter_Field",
+        lambda self, node: walked.append(node.get_path()),
+    )
+    argv = [SELECT_RDL, "-o", str(tmp_path), "-t", "axi4l", "c_header"]
+    main(argv + ["--select", "select.left", "--select", "select.dma[1]"])
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        ".bus-generator",
+        "dma_1.h",
+        "dma_1_regs.v",
+        "left.h",
+        "left_regs.v",
+    ]
+    assert "module dma_1_regs (" in (tmp_path / "dma_1_regs.v").read_text()
+    # Only the selected subtrees are walked
+    assert len(walked) == 2 * 4 * 2
+    assert all(path.startswith(("select.left.", "select.dma[1].")) for path in walked)
+
+    # The selection is part of the manifest: the same run is up to date, a
+    # different selection regenerates
+    main(argv + ["--select", "select.left", "--select", "select.dma[1]"])
+    assert len(count_compiles) == 1
+    main(argv + ["--select", "select.sub.inner"])
+    assert len(count_compiles) == 2
+    assert (tmp_path / "inner_regs.v").is_file()
+
+
+def test_cli_select_reports_invalid_path(tmp_path, caplog):
+    with pytest.raises(SystemExit) as excinfo:
+        main([SELECT_RDL, "-o", str(tmp_path), "--select", "select.dma"])
+    assert excinfo.value.code == 1
+    assert "Cannot select 'select.dma': it is an array" in caplog.text
+
+
+# ---------------------------------------------------------------------------
+# Several tops from one compilation (--top, --all-tops)
+# ---------------------------------------------------------------------------
+
+LIBRARY_RDL = "tests/library.rdl"
+
+
+def test_compile_tops_elaborates_every_top_from_one_compile(count_compiles):
+    tops, sources = compile_tops([LIBRARY_RDL], all_tops=True)
+    assert [top.inst_name for top in tops] == ["uart", "timer", "spi"]
+    assert count_compiles == [LIBRARY_RDL]
+    assert sources == [os.path.abspath(LIBRARY_RDL)]
+
+    (spi, uart), _ = compile_tops([LIBRARY_RDL], ["spi", "uart"])
+    assert [spi.inst_name, uart.inst_name] == ["spi", "uart"]
+    assert compile_tops([LIBRARY_RDL])[0][0].inst_name == "spi"
+
+
+def test_cli_all_tops_matches_generating_each_top(tmp_path, count_compiles):
+    templates = ["-t", "axi4l", "c_header"]
+    main([LIBRARY_RDL, "-o", str(tmp_path / "all"), "--all-tops", *templates])
+    assert len(count_compiles) == 1
+    for name in ("uart", "timer", "spi"):
+        main([LIBRARY_RDL, "-o", str(tmp_path / name), "--top", name, *templates])
+
+    generated = sorted(path.name for path in (tmp_path / "all").glob("*[.][vh]"))
+    assert generated == [
+        "spi.h",
+        "spi_regs.v",
+        "timer.h",
+        "timer_regs.v",
+        "uart.h",
+        "uart_regs.v",
+    ]
+    for name in generated:
+        top = name.partition(".")[0].removesuffix("_regs")
+        assert (tmp_path / "all" / name).read_bytes() == (
+            tmp_path / top / name
+        ).read_bytes()
+
+
+def test_cli_select_resolves_paths_against_their_top(tmp_path):
+    main(
+        [LIBRARY_RDL, "-o", str(tmp_path), "--top", "timer", "--top", "spi"]
+        + ["--select", "spi.bridge", "--select", "timer"]
+    )
+    assert sorted(path.name for path in tmp_path.glob("*.v")) == [
+        "bridge_regs.v",
+        "timer_regs.v",
+    ]
+
+
+def test_parse_arguments_rejects_top_with_all_tops(capsys):
+    with pytest.raises(SystemExit):
+        parse_arguments([LIBRARY_RDL, "-o", "out", "--top", "spi", "--all-tops"])
+    assert "--top cannot be combined with --all-tops" in capsys.readouterr().err
+
+
+def test_cli_top_reports_unknown_top(tmp_path):
+    with pytest.raises(SystemExit) as excinfo:
+        main([LIBRARY_RDL, "-o", str(tmp_path), "--top", "missing"])
+    assert excinfo.value.code == 1
+
+
+# ---------------------------------------------------------------------------
+# Pipelined register readback (--readback-radix, --readback-stages)
+# ---------------------------------------------------------------------------
+
+
+def test_readback_levels_spread_stages_over_the_tree():
+    assert RtlOptions(4, 0).readback_levels(100) == [
+        (100, False),
+        (25, False),
+        (7, False),
+        (2, False),
+        (1, False),
+    ]
+    assert [registered for _, registered in RtlOptions(4, 2).readback_levels(100)] == [
+        False,
+        True,
+        False,
+        True,
+        False,
+    ]
+    # At most one stage per level below the root
+    assert RtlOptions(4, 9).readback_levels(20) == [
+        (20, True),
+        (5, True),
+        (2, True),
+        (1, False),
+    ]
+    assert RtlOptions(4, 2).readback_levels(1) == [(1, False)]
+
+
+def test_axi4l_readback_tree_deepens_the_read_response_fifo():
+    register_map = build_register_map(_compile(ARRAYS_RDL), rolled=True)
+    ((_, flat),) = render(register_map, ["{{axi4l}}_regs.v.jinja2"])
+    ((_, tree),) = render(
+        register_map, ["{{axi4l}}_regs.v.jinja2"], rtl=RtlOptions(4, 2)
+    )
+
+    assert "localparam integer R_DEPTH    = 2;" in flat
+    assert "rd_leaves" not in flat
+    # The tree follows readback_levels() and is simulated by test_stress; two
+    # stages add two outstanding reads and response entries
+    assert "localparam integer RD_LEAVES = 20;" in tree
+    assert "localparam integer R_DEPTH    = 4;" in tree
+
+
+def test_cli_readback_options_change_the_output(tmp_path):
+    main([GPIO_RDL, "-o", str(tmp_path), "-q"])
+    flat = (tmp_path / "gpio_regs.v").read_text()
+    main([GPIO_RDL, "-o", str(tmp_path), "-q", "--readback-radix", "2"])
+    tree = (tmp_path / "gpio_regs.v").read_text()
+
+    assert "rd_leaves" not in flat
+    assert "rd_leaves" in tree
+
+
+@pytest.mark.parametrize(
+    ("argv", "message"),
+    [
+        (["--readback-radix", "1"], "--readback-radix must be at least 2"),
+        (["--readback-stages", "2"], "--readback-stages needs --readback-radix"),
+        (
+            ["--readback-radix", "4", "--readback-stages", "-1"],
+            "--readback-stages must not be negative",
+        ),
+    ],
+)
+def test_parse_arguments_rejects_invalid_readback_options(argv, message, capsys):
+    with pytest.raises(SystemExit):
+        parse_arguments([GPIO_RDL, "-o", "out"] + argv)
+    assert message in capsys.readouterr().err
+
+
+# ---------------------------------------------------------------------------
+# Response FIFO depth (--response-depth)
+# ---------------------------------------------------------------------------
+
+
+def test_axi4l_response_depth_sizes_the_response_fifos():
+    register_map = build_register_map(_compile(GPIO_RDL))
+    ((_, default),) = render(register_map, ["{{axi4l}}_regs.v.jinja2"])
+    ((_, deep),) = render(
+        register_map, ["{{axi4l}}_regs.v.jinja2"], rtl=RtlOptions(response_depth=5)
+    )
+
+    assert "localparam integer B_DEPTH    = 2;" in default
+    assert "localparam integer R_DEPTH    = 2;" in default
+    assert "reg  [           0:0] b_wr_ptr;" in default
+
+    assert "localparam integer B_DEPTH    = 5;" in deep
+    assert "localparam integer R_DEPTH    = 5;" in deep
+    assert "reg  [           2:0] b_outstanding;" in deep
+    assert "reg  [           2:0] r_rd_ptr;" in deep
+    assert "assign b_credit         = (b_outstanding != 3'd5) || b_hsk;" in deep
+    assert "b_wr_ptr <= (b_wr_ptr == 3'd4) ? 3'd0 : b_wr_ptr + 3'd1;" in deep
+    assert "assign s_axi_rdata   = r_data_fifo[r_rd_ptr*DATA_WIDTH +: DATA_WIDTH];" in deep
+
+
+def test_axi4l_response_depth_adds_to_the_readback_stages():
+    register_map = build_register_map(_compile(ARRAYS_RDL), rolled=True)
+    ((_, text),) = render(
+        register_map,
+        ["{{axi4l}}_regs.v.jinja2"],
+        rtl=RtlOptions(4, 2, response_depth=4),
+    )
+
+    assert "localparam integer B_DEPTH    = 4;" in text
+    assert "localparam integer R_DEPTH    = 6;" in text
+
+
+def test_parse_arguments_rejects_invalid_response_depth(capsys):
+    with pytest.raises(SystemExit):
+        parse_arguments([GPIO_RDL, "-o", "out", "--response-depth", "0"])
+    assert "--response-depth must be positive" in capsys.readouterr().err
+
+
+# ---------------------------------------------------------------------------
+# Dual issue (--dual-issue)
+# ---------------------------------------------------------------------------
+
+
+def test_axi4l_dual_issue_decodes_reads_and_writes_separately():
+    register_map = build_register_map(_compile(MEM_ACCESS_RDL))
+    templates = ["{{axi4l}}_regs.v.jinja2", "tb_{{axi4l}}_regs.v.jinja2"]
+    (_, single), _ = render(register_map, templates)
+    (_, dual), (_, tb) = render(
+        register_map, templates, rtl=RtlOptions(dual_issue=True)
+    )
+
+    assert "head_write" in single
+    assert "rd_wr_hazard" not in single
+
+    assert "head_write" not in dual
+    assert "wire [ADDR_WIDTH-1:0] int_rd_addr;" in dual
+    assert (
+        "assign issue_read       = "
+        "rd_ready && !(rd_wr_hazard && wr_ready && !priority_read);"
+    ) in dual
+    assert (
+        "assign issue_write      = "
+        "wr_ready && !(rd_wr_hazard && rd_ready && priority_read);"
+    ) in dual
+    # Only a memory that is read and written shares its port between both paths
+    assert (
+        "assign rd_wr_hazard = (int_rd_addr[6:2] == int_wr_addr[6:2]) "
+        "|| (mem_rw_rd_strb && mem_rw_wr_strb);"
+    ) in dual
+    assert "assign mem_r_addr = int_rd_addr[2:2];" in dual
+    assert "assign mem_w_addr = int_wr_addr[2:2];" in dual
+    assert (
+        "assign mem_rw_addr = (int_wr_en && mem_rw_wr_strb) "
+        "? int_wr_addr[2:2] : int_rd_addr[2:2];"
+    ) in dual
+
+    assert "DUT.int_rd_en && DUT.mem_rw_rd_strb" in tb
+    assert "DUT.int_wr_en && DUT.mem_rw_wr_strb" in tb
+
+
+def test_cli_dual_issue_changes_the_output(tmp_path):
+    main([GPIO_RDL, "-o", str(tmp_path), "-q", "--dual-issue"])
+    text = (tmp_path / "gpio_regs.v").read_text()
+
+    assert "wire data_rd_strb;" in text
+    assert "wire data_wr_strb;" in text
+
+
+# ---------------------------------------------------------------------------
+# Low-latency register reads (--low-latency-reads)
+# ---------------------------------------------------------------------------
+
+
+def test_axi4l_low_latency_reads_bypass_the_empty_read_response_fifo():
+    register_map = build_register_map(_compile(MEM_ACCESS_RDL))
+    ((_, default),) = render(register_map, ["{{axi4l}}_regs.v.jinja2"])
+    ((_, text),) = render(
+        register_map,
+        ["{{axi4l}}_regs.v.jinja2"],
+        rtl=RtlOptions(low_latency_reads=True),
+    )
+
+    assert "r_bypass" not in default
+    assert "assign s_axi_rvalid  = r_pending != 2'd0;" in default
+
+    assert (
+        "assign r_bypass      = rd_ack_fire && int_rd_bypass && (r_pending == 2'd0);"
+    ) in text
+    assert "assign s_axi_rvalid  = (r_pending != 2'd0) || r_bypass;" in text
+    assert "assign s_axi_rdata   = r_bypass ? int_rd_data : r_data_fifo" in text
+    # Memory reads go through the FIFO
+    assert "int_rd_bypass <= !rd_mem_pending;" in text
+
+
+def test_axi4l_low_latency_reads_follow_the_readback_pipeline():
+    register_map = build_register_map(_compile(ARRAYS_RDL), rolled=True)
+    ((_, text),) = render(
+        register_map,
+        ["{{axi4l}}_regs.v.jinja2"],
+        rtl=RtlOptions(4, 2, low_latency_reads=True),
+    )
+
+    assert "int_rd_bypass <= rd_pipe_valid[1];" in text
+
+
+def test_cli_low_latency_reads_change_the_output(tmp_path):
+    main([GPIO_RDL, "-o", str(tmp_path), "-q", "--low-latency-reads"])
+
+    assert "r_bypass" in (tmp_path / "gpio_regs.v").read_text()